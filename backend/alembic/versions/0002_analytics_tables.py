@@ -0,0 +1,44 @@
+"""analytics tables
+
+chat_intent_rollups and conversation_stats, written by the analytics
+consumer. Kept out of 0001 so that a database stamped at 0001 (tables
+created before the migrations existed) gets them on upgrade.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "chat_intent_rollups",
+        sa.Column("window_start", sa.DateTime(timezone=True), primary_key=True),
+        sa.Column("intent", sa.String(20), primary_key=True),
+        sa.Column("turns", sa.Integer(), nullable=False),
+        sa.Column("latency_ms_sum", sa.BigInteger(), nullable=False),
+        sa.Column("latency_ms_max", sa.Integer(), nullable=False),
+    )
+
+    op.create_table(
+        "conversation_stats",
+        sa.Column("conversation_id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("turns", sa.Integer(), nullable=False),
+        sa.Column("last_turn_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_conversation_stats_user_id", "conversation_stats", ["user_id"])
+
+
+
+def downgrade() -> None:
+    op.drop_table("conversation_stats")
+    op.drop_table("chat_intent_rollups")
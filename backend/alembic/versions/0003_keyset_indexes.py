@@ -0,0 +1,39 @@
+"""composite indexes for keyset pagination
+
+Replaces the single-column indexes on chat_messages.conversation_id and
+conversations.user_id with (conversation_id, id) and (user_id, id), so a
+page of history or of a user's conversations is an index range scan in id
+order rather than a scan and sort of the whole conversation. On PostgreSQL
+the indexes are built CONCURRENTLY, outside the migration transaction.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# (new index, columns, index it supersedes)
+INDEXES = [
+    ("chat_messages", "ix_chat_messages_conversation_id_id", ["conversation_id", "id"], "ix_chat_messages_conversation_id"),
+    ("conversations", "ix_conversations_user_id_id", ["user_id", "id"], "ix_conversations_user_id"),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table, name, columns, old in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+            op.drop_index(old, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table, name, columns, old in INDEXES:
+            op.create_index(old, table, columns[:1], postgresql_concurrently=True, if_not_exists=True)
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,160 @@
+# Chat analytics consumer: python -m app.analytics.worker
+#
+# Instances share a consumer group, so Kafka spreads the topic's partitions
+# across them. Events are folded into in-memory counters and periodically
+# upserted into the rollup tables; offsets are committed only after the upsert
+# has landed (at-least-once: a crash in between replays, and recounts, at most
+# one flush worth of events).
+import asyncio
+import logging
+import signal
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import orjson
+from aiokafka import AIOKafkaConsumer, ConsumerRebalanceListener
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db import models
+from app.db.session import async_engine
+from app.logging import configure_logging
+from app.settings import settings
+
+log = logging.getLogger("analytics.worker")
+
+
+class RollupAggregator:
+    def __init__(self, window_s: int):
+        self.window_s = window_s
+        self.reset()
+
+    def reset(self) -> None:
+        # (window_start, intent) -> [turns, latency_sum, latency_max]
+        self.intents: dict[tuple[datetime, str], list[int]] = defaultdict(lambda: [0, 0, 0])
+        # conversation_id -> [user_id, turns, last_turn_at]
+        self.conversations: dict[int, list] = {}
+        self.events = 0
+
+    def add(self, event: dict) -> None:
+        cid, user_id = int(event["conversation_id"]), int(event["user_id"])
+        ts = event.get("ts") or int(time.time() * 1000)
+        at = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
+        window = datetime.fromtimestamp(ts // 1000 // self.window_s * self.window_s, tz=timezone.utc)
+        latency = int(event.get("latency_ms") or 0)
+        row = self.intents[(window, event.get("intent") or "unknown")]
+        row[0] += 1
+        row[1] += latency
+        row[2] = max(row[2], latency)
+
+        conv = self.conversations.setdefault(cid, [user_id, 0, at])
+        conv[1] += 1
+        conv[2] = max(conv[2], at)
+        self.events += 1
+
+    async def flush(self) -> None:
+        if not self.events:
+            return
+        async with async_engine.begin() as conn:
+            t = models.ChatIntentRollup
+            stmt = insert(t).values([
+                {"window_start": w, "intent": i, "turns": n, "latency_ms_sum": s, "latency_ms_max": m}
+                for (w, i), (n, s, m) in self.intents.items()
+            ])
+            await conn.execute(stmt.on_conflict_do_update(
+                index_elements=[t.window_start, t.intent],
+                set_={
+                    "turns": t.turns + stmt.excluded.turns,
+                    "latency_ms_sum": t.latency_ms_sum + stmt.excluded.latency_ms_sum,
+                    "latency_ms_max": func.greatest(t.latency_ms_max, stmt.excluded.latency_ms_max),
+                },
+            ))
+
+            c = models.ConversationStats
+            stmt = insert(c).values([
+                {"conversation_id": cid, "user_id": u, "turns": n, "last_turn_at": at}
+                for cid, (u, n, at) in sorted(self.conversations.items())
+            ])
+            await conn.execute(stmt.on_conflict_do_update(
+                index_elements=[c.conversation_id],
+                set_={
+                    "turns": c.turns + stmt.excluded.turns,
+                    "last_turn_at": func.greatest(c.last_turn_at, stmt.excluded.last_turn_at),
+                },
+            ))
+        log.info("analytics.flushed", extra={"count": self.events})
+        self.reset()
+
+
+class _FlushOnRevoke(ConsumerRebalanceListener):
+    # Partitions about to move to another instance: persist and commit what we
+    # have so the new owner does not count it again.
+    def __init__(self, worker: "AnalyticsWorker"):
+        self.worker = worker
+
+    async def on_partitions_revoked(self, revoked):
+        if revoked:
+            await self.worker.checkpoint()
+
+    async def on_partitions_assigned(self, assigned):
+        log.info("analytics.assigned", extra={"detail": ",".join(f"{tp.topic}:{tp.partition}" for tp in assigned)})
+
+
+class AnalyticsWorker:
+    def __init__(self):
+        self.consumer = AIOKafkaConsumer(
+            bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+            client_id=f"{settings.KAFKA_CLIENT_ID}-analytics",
+            group_id=settings.ANALYTICS_GROUP_ID,
+            enable_auto_commit=False,
+            auto_offset_reset="earliest",
+        )
+        self.agg = RollupAggregator(settings.ANALYTICS_WINDOW_S)
+        self.stopping = asyncio.Event()
+        self.skipped = 0
+        self._last_flush = time.monotonic()
+
+    async def checkpoint(self) -> None:
+        await self.agg.flush()
+        await self.consumer.commit()
+        self._last_flush = time.monotonic()
+
+    def _consume(self, records) -> None:
+        for r in records:
+            try:
+                event = orjson.loads(r.value)
+                if event.get("type") == "turn":
+                    self.agg.add(event)
+            except (orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+                self.skipped += 1
+                log.warning("analytics.bad_event", extra={"detail": f"{r.topic}:{r.partition}:{r.offset}"})
+
+    async def run(self) -> None:
+        self.consumer.subscribe(settings.ANALYTICS_TOPICS, listener=_FlushOnRevoke(self))
+        await self.consumer.start()
+        try:
+            while not self.stopping.is_set():
+                batches = await self.consumer.getmany(timeout_ms=1000, max_records=settings.ANALYTICS_BATCH_MAX)
+                for records in batches.values():
+                    self._consume(records)
+                due = time.monotonic() - self._last_flush >= settings.ANALYTICS_FLUSH_S
+                if self.agg.events >= settings.ANALYTICS_FLUSH_EVENTS or (due and self.agg.events):
+                    await self.checkpoint()
+            await self.checkpoint()
+        finally:
+            await self.consumer.stop()
+            await async_engine.dispose()
+
+
+async def main() -> None:
+    configure_logging()
+    worker = AnalyticsWorker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stopping.set)
+    await worker.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
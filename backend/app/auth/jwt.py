@@ -1,9 +1,17 @@
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
+from threading import Lock
 from jose import jwt
 from app.settings import settings
 
 ALGO = "HS256"
 
+# Verified tokens -> (exp, payload). Entries are dropped at exp, so a cache hit
+# is never more permissive than a full decode.
+_verified: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+_verified_lock = Lock()
+
 def _now():
     return datetime.now(timezone.utc)
 
@@ -19,3 +27,19 @@ def create_refresh_token(user_id: int) -> str:
 
 def decode_token(token: str) -> dict:
     return jwt.decode(token, settings.JWT_SECRET, algorithms=[ALGO], issuer=settings.JWT_ISSUER)
+
+def decode_token_cached(token: str) -> dict:
+    now = time.time()
+    with _verified_lock:
+        hit = _verified.get(token)
+        if hit is not None:
+            if hit[0] > now:
+                _verified.move_to_end(token)
+                return hit[1]
+            del _verified[token]
+    payload = decode_token(token)
+    with _verified_lock:
+        _verified[token] = (float(payload["exp"]), payload)
+        while len(_verified) > settings.AUTH_TOKEN_CACHE_SIZE:
+            _verified.popitem(last=False)
+    return payload
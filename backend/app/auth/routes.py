@@ -1,21 +1,34 @@
 import logging
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.db import crud
 from app.auth.schemas import SignupIn, LoginIn, TokenOut
-from app.auth.security import hash_password
+from app.auth.security import HashPoolSaturated, hash_password_async, verify_and_update_async
 from app.auth.jwt import create_access_token, create_refresh_token
 
 log = logging.getLogger("auth")
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+def _busy() -> HTTPException:
+    return HTTPException(status_code=503, detail="Authentication is busy, retry shortly", headers={"Retry-After": "1"})
+
 @router.post("/signup", response_model=TokenOut)
-def signup(body: SignupIn, db: Session = Depends(get_db)):
-    if crud.get_user_by_email(db, body.email):
+async def signup(body: SignupIn, db: AsyncSession = Depends(get_async_db)):
+    if await crud.get_user_by_email_async(db, body.email):
+        raise HTTPException(status_code=409, detail="Email already registered")
+    # Don't hold a pooled connection while bcrypt runs
+    await db.close()
+    try:
+        password_hash = await hash_password_async(body.password)
+    except HashPoolSaturated:
+        raise _busy()
+    try:
+        user = await crud.create_user_async(db, body.email, password_hash)
+    except IntegrityError:
         raise HTTPException(status_code=409, detail="Email already registered")
-    user = crud.create_user(db, body.email, hash_password(body.password))
     log.info("user.signup", extra={"user_id": user.id})
     return TokenOut(
         access_token=create_access_token(user.id),
@@ -23,10 +36,21 @@ def signup(body: SignupIn, db: Session = Depends(get_db)):
     )
 
 @router.post("/login", response_model=TokenOut)
-def login(body: LoginIn, db: Session = Depends(get_db)):
-    user = crud.authenticate_user(db, body.email, body.password)
+async def login(body: LoginIn, db: AsyncSession = Depends(get_async_db)):
+    user = await crud.get_user_by_email_async(db, body.email)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    await db.close()
+    try:
+        ok, new_hash = await verify_and_update_async(body.password, user.password_hash)
+    except HashPoolSaturated:
+        raise _busy()
+    if not ok:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # Stored hash predates the current BCRYPT_ROUNDS
+        await crud.update_password_hash_async(db, user.id, new_hash)
+        log.info("user.password_rehashed", extra={"user_id": user.id})
     log.info("user.login", extra={"user_id": user.id})
     return TokenOut(
         access_token=create_access_token(user.id),
@@ -1,9 +1,67 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.settings import settings
+
+# min == max == default, so hashes at any other cost report needs_update and
+# are rehashed on the next successful login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
-def verify_password(password: str, hashed: str) -> bool:
-    return pwd_context.verify(password, hashed)
+def verify_and_update(password: str, hashed: str) -> tuple[bool, str | None]:
+    return pwd_context.verify_and_update(password, hashed)
+
+
+class HashPoolSaturated(Exception):
+    pass
+
+# bcrypt is deliberately slow; it runs in a small dedicated process pool so a
+# login storm cannot starve the event loop or the shared threadpool.
+_pool: ProcessPoolExecutor | None = None
+_inflight = 0
+
+def start_hash_pool() -> None:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.AUTH_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        # Spawn the workers now rather than on the first login
+        for _ in range(settings.AUTH_HASH_WORKERS):
+            _pool.submit(hash_password, "warm-up")
+
+def stop_hash_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+async def _offload(fn, *args):
+    global _inflight
+    if _inflight >= settings.AUTH_HASH_MAX_INFLIGHT:
+        raise HashPoolSaturated()
+    _inflight += 1
+    try:
+        if _pool is None:
+            return await asyncio.to_thread(fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(_pool, fn, *args)
+    finally:
+        _inflight -= 1
+
+async def hash_password_async(password: str) -> str:
+    return await _offload(hash_password, password)
+
+async def verify_and_update_async(password: str, hashed: str) -> tuple[bool, str | None]:
+    return await _offload(verify_and_update, password, hashed)
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import math
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from threading import Lock
+
+from redis import RedisError
+
+from app.chat.memory import tenant_key, user_key
+from app.messaging.redis import async_redis_client
+from app.settings import settings
+
+log = logging.getLogger("chat.admission")
+
+stats: Counter = Counter()
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"Retry-After": str(self.retry_after)}
+
+
+# Token buckets, checked all-or-nothing: the cost is only taken when every
+# bucket (user and tenant) has enough tokens. Redis TIME is the clock, so all
+# API replicas agree on refill.
+# ARGV: cost, then (rate_per_s, burst) for each key. Returns {allowed, retry_after_s}.
+_TOKEN_BUCKET = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local cost = tonumber(ARGV[1])
+local state = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[2 * i])
+  local burst = tonumber(ARGV[2 * i + 1])
+  local b = redis.call('HMGET', key, 'tokens', 'ts')
+  local tokens = tonumber(b[1]) or burst
+  local ts = tonumber(b[2]) or now
+  tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+  state[i] = tokens
+  if tokens < cost then
+    wait = math.max(wait, (cost - tokens) / rate)
+  end
+end
+local allowed = wait == 0 and 1 or 0
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[2 * i])
+  local burst = tonumber(ARGV[2 * i + 1])
+  local tokens = state[i]
+  if allowed == 1 then tokens = tokens - cost end
+  redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+  redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+end
+return {allowed, tostring(wait)}
+"""
+
+
+class RedisBuckets:
+    def __init__(self, redis):
+        self._script = redis.register_script(_TOKEN_BUCKET)
+
+    async def take(self, buckets: list[tuple[str, float, float]], cost: float) -> tuple[bool, float]:
+        argv: list[float] = [cost]
+        for _, rate, burst in buckets:
+            argv += [rate, burst]
+        allowed, wait = await self._script(keys=[k for k, _, _ in buckets], args=argv)
+        return bool(int(allowed)), float(wait)
+
+
+class LocalBuckets:
+    # In-process stand-in with the same semantics as the Lua script, for tests
+    # and single-process runs without Redis (RATE_LIMIT_BACKEND=local).
+    def __init__(self):
+        self._state: dict[str, tuple[float, float]] = {}
+        self._lock = Lock()
+
+    async def take(self, buckets: list[tuple[str, float, float]], cost: float) -> tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            wait = 0.0
+            for key, rate, burst in buckets:
+                tokens, ts = self._state.get(key, (burst, now))
+                tokens = min(burst, tokens + max(0.0, now - ts) * rate)
+                levels.append(tokens)
+                if tokens < cost:
+                    wait = max(wait, (cost - tokens) / rate)
+            allowed = wait == 0
+            for (key, _, _), tokens in zip(buckets, levels):
+                self._state[key] = (tokens - cost if allowed else tokens, now)
+            return allowed, wait
+
+
+_buckets = LocalBuckets() if settings.RATE_LIMIT_BACKEND == "local" else RedisBuckets(async_redis_client)
+
+
+async def check_rate_limit(user_id: int, intent: str | None = None, tenant: str = "default") -> None:
+    # Charged in two steps so a limited user is turned away before intent
+    # classification (which may call the LLM): intent=None takes the base cost
+    # every turn pays, then the intent's surcharge over it once it is known.
+    base = min(settings.RATE_LIMIT_INTENT_COST.values(), default=1.0)
+    cost = base if intent is None else settings.RATE_LIMIT_INTENT_COST.get(intent, base) - base
+    if not settings.RATE_LIMIT_ENABLED or cost <= 0:
+        return
+    buckets = [
+        (f"{user_key(user_id, tenant)}:ratelimit", settings.RATE_LIMIT_USER_PER_MIN / 60, settings.RATE_LIMIT_USER_BURST),
+        (f"{tenant_key(tenant)}:ratelimit", settings.RATE_LIMIT_TENANT_PER_MIN / 60, settings.RATE_LIMIT_TENANT_BURST),
+    ]
+    try:
+        allowed, wait = await _buckets.take(buckets, cost)
+    except RedisError:
+        # Fail open: a Redis outage should not take chat down with it
+        stats["limiter_errors"] += 1
+        log.warning("chat.admission.limiter_unavailable", exc_info=True)
+        return
+    if not allowed:
+        stats[f"rate_limited:{intent or 'turn'}"] += 1
+        raise AdmissionRejected(429, "Too many requests", wait)
+
+
+class ConcurrencyGate:
+    # Semaphore with a bounded wait queue: callers beyond `limit` wait up to
+    # `timeout_s`, and once `max_waiters` are already queued new callers are
+    # turned away immediately instead of piling up.
+    def __init__(self, name: str, limit: int, max_waiters: int, timeout_s: float):
+        self.name = name
+        self.limit = limit
+        self.max_waiters = max_waiters
+        self.timeout_s = timeout_s
+        self.active = 0
+        self.waiting = 0
+        self._sem = asyncio.Semaphore(limit)
+
+    async def acquire(self, deadline: float) -> None:
+        if self._sem.locked():
+            if self.waiting >= self.max_waiters:
+                stats[f"shed:{self.name}"] += 1
+                raise AdmissionRejected(503, "Server busy", self.timeout_s)
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._sem.acquire(), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                stats[f"timeout:{self.name}"] += 1
+                raise AdmissionRejected(503, "Server busy", self.timeout_s) from None
+            finally:
+                self.waiting -= 1
+        else:
+            await self._sem.acquire()
+        self.active += 1
+
+    def release(self) -> None:
+        self.active -= 1
+        self._sem.release()
+
+
+_global_gate = ConcurrencyGate("llm", settings.LLM_MAX_CONCURRENCY, settings.LLM_QUEUE_MAX, settings.LLM_QUEUE_TIMEOUT_S)
+_intent_gates = {
+    intent: ConcurrencyGate(intent, limit, settings.LLM_QUEUE_MAX, settings.LLM_QUEUE_TIMEOUT_S)
+    for intent, limit in settings.LLM_INTENT_CONCURRENCY.items()
+}
+
+
+@asynccontextmanager
+async def llm_slot(intent: str | None = None):
+    # Per-intent gate first (expensive agent runs queue among themselves),
+    # then the process-wide one; both share a single deadline.
+    deadline = time.monotonic() + settings.LLM_QUEUE_TIMEOUT_S
+    gates = [g for g in (_intent_gates.get(intent), _global_gate) if g is not None]
+    held: list[ConcurrencyGate] = []
+    try:
+        for gate in gates:
+            await gate.acquire(deadline)
+            held.append(gate)
+        yield
+    finally:
+        for gate in reversed(held):
+            gate.release()
+
+
+def admission_stats() -> dict:
+    gates = [_global_gate, *_intent_gates.values()]
+    return {
+        **stats,
+        **{f"active:{g.name}": g.active for g in gates},
+        **{f"waiting:{g.name}": g.waiting for g in gates},
+    }
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from threading import Lock
+
+import orjson
+from pydantic import BaseModel, Field
+
+from app.chat import llm
+from app.menu import catalog
+
+log = logging.getLogger("chat.agents")
+
+# CrewAI and AutoGen take seconds to import (CrewAI alone pulls in chromadb and
+# litellm), so they are never imported with app.main: either warm_up() loads
+# them in a background thread after startup, or the first agent turn does.
+# scripts/import_report.py fails if they creep back into the import graph.
+
+DELIVERY_TASK = (
+    "User wants delivery/order help. Message: {message}\n"
+    "Ask for missing details: address, items, customizations, payment instructions.\n"
+    "Use the price_cart tool for the cart: it resolves item and modifier names and returns "
+    "exact prices and totals. Never calculate prices yourself; ask about anything it reports as an error."
+)
+RESERVATION_SYSTEM = (
+    "You book restaurant tables. Ask for date, time, party size, name, phone (optional). "
+    "Confirm details at the end."
+)
+
+_lock = Lock()
+_delivery_crew = None
+_assistant_cls = None
+
+
+class CartLine(BaseModel):
+    item: str = Field(description="Menu item name, as the customer said it, or its id")
+    quantity: int = 1
+    modifiers: list[str] = Field(default_factory=list, description='e.g. "Size: Large", "extra cheese"')
+
+
+class Cart(BaseModel):
+    lines: list[CartLine]
+
+
+def _price_cart(lines: list) -> str:
+    menu = catalog.current()
+    if menu is None:
+        return '{"ok": false, "errors": ["The menu is unavailable right now; do not quote prices."]}'
+    lines = [line.model_dump() if isinstance(line, BaseModel) else line for line in lines]
+    return orjson.dumps(catalog.price_cart(menu, lines)).decode()
+
+
+def _never_cache(_args=None, _result=None) -> bool:
+    # Prices follow the menu version, so tool results are never reused
+    return False
+
+
+def _cart_tool():
+    from crewai.tools import BaseTool
+
+    class PriceCartTool(BaseTool):
+        name: str = "price_cart"
+        description: str = (
+            "Validate and price a delivery cart against the current menu. Returns each line with its "
+            "unit price and line total, the subtotal, and errors for unknown items or modifiers."
+        )
+        args_schema: type[BaseModel] = Cart
+
+        def _run(self, lines: list) -> str:
+            return _price_cart(lines)
+
+    return PriceCartTool(cache_function=_never_cache)
+
+
+def _build_delivery_crew():
+    global _delivery_crew
+    with _lock:
+        if _delivery_crew is None:
+            from crewai import Agent, Crew, Task
+
+            sales_agent = Agent(
+                role="Sales Agent",
+                goal="Increase conversions while respecting user preferences.",
+                backstory="Expert at upsell combos and confirming order details.",
+                llm=llm.crewai_llm("delivery"),
+                tools=[_cart_tool()],
+                verbose=False,
+            )
+            task = Task(
+                description=DELIVERY_TASK,
+                expected_output="A clear, step-by-step message confirming cart and next questions.",
+                agent=sales_agent,
+            )
+            _delivery_crew = Crew(agents=[sales_agent], tasks=[task], verbose=False)
+    return _delivery_crew
+
+
+def _load_autogen():
+    global _assistant_cls
+    with _lock:
+        if _assistant_cls is None:
+            from autogen_agentchat.agents import AssistantAgent
+
+            llm.autogen_client("reservation")
+            _assistant_cls = AssistantAgent
+    return _assistant_cls
+
+
+async def delivery_crew():
+    # kickoff interpolates inputs into the tasks in place, so every turn runs
+    # on a copy of the pre-built template.
+    template = _delivery_crew or await asyncio.to_thread(_build_delivery_crew)
+    return template.copy()
+
+
+async def reservation_agent():
+    # AssistantAgent keeps the dialogue in its model context, so each turn
+    # gets its own; with the class loaded and the model client shared, that
+    # costs microseconds.
+    cls = _assistant_cls or await asyncio.to_thread(_load_autogen)
+    return cls(name="ReservationAgent", system_message=RESERVATION_SYSTEM, model_client=llm.autogen_client("reservation"))
+
+
+def warm_up() -> None:
+    for load in (_build_delivery_crew, _load_autogen):
+        try:
+            load()
+        except Exception:
+            log.warning("chat.agents.warm_up_failed", exc_info=True, extra={"detail": load.__name__})
@@ -0,0 +1,129 @@
+import hashlib
+import logging
+import re
+import time
+from collections import Counter, OrderedDict
+from threading import Lock
+
+from redis import RedisError
+from redis.asyncio import Redis
+
+from app.chat.tools import get_hours, get_location
+from app.menu.version import get_menu_version, on_menu_change
+from app.messaging.redis import async_redis_client
+from app.settings import settings
+
+log = logging.getLogger("chat.cache")
+
+CACHEABLE_INTENTS = ("info", "menu")
+
+_PUNCT = re.compile(r"[^\w\s]")
+_WS = re.compile(r"\s+")
+
+
+def normalize_input(text: str) -> str:
+    return _WS.sub(" ", _PUNCT.sub(" ", text.lower())).strip()
+
+
+def context_version(intent: str) -> str:
+    if intent == "menu":
+        return f"m{get_menu_version()}"
+    return hashlib.sha1(f"{get_hours()}|{get_location()}".encode()).hexdigest()[:12]
+
+
+class LRUCache:
+    def __init__(self, maxsize: int, ttl_s: int):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._data: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl_s: int | None = None) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl_s or self.ttl_s), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ResponseCache:
+    # In-process LRU in front of a shared Redis tier. Keys embed the grounding
+    # context version, so a menu change makes old answers unreachable everywhere.
+
+    def __init__(self, redis: Redis, maxsize: int, ttl_s: int):
+        self.redis = redis
+        self.ttl_s = ttl_s
+        self.local = LRUCache(maxsize, ttl_s)
+        self.stats: Counter = Counter()
+
+    def key(self, intent: str, text: str) -> str:
+        digest = hashlib.sha1(normalize_input(text).encode()).hexdigest()
+        return f"chat:cache:{intent}:{context_version(intent)}:{digest}"
+
+    async def get(self, intent: str, text: str) -> str | None:
+        if not settings.RESPONSE_CACHE_ENABLED or intent not in CACHEABLE_INTENTS:
+            return None
+        key = self.key(intent, text)
+        value = self.local.get(key)
+        if value is not None:
+            self.stats["local_hits"] += 1
+            return value
+        try:
+            value = await self.redis.get(key)
+        except RedisError:
+            self.stats["errors"] += 1
+            log.warning("chat.cache.get_failed", exc_info=True)
+            value = None
+        if value is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["redis_hits"] += 1
+        self.local.set(key, value)
+        return value
+
+    async def set(self, intent: str, text: str, value: str) -> None:
+        if not settings.RESPONSE_CACHE_ENABLED or intent not in CACHEABLE_INTENTS or not value:
+            return
+        key = self.key(intent, text)
+        self.local.set(key, value)
+        try:
+            await self.redis.set(key, value, ex=self.ttl_s)
+            self.stats["sets"] += 1
+        except RedisError:
+            self.stats["errors"] += 1
+            log.warning("chat.cache.set_failed", exc_info=True)
+
+    def invalidate_local(self) -> None:
+        self.local.clear()
+        self.stats["invalidations"] += 1
+
+
+response_cache = ResponseCache(
+    async_redis_client,
+    maxsize=settings.RESPONSE_CACHE_LOCAL_SIZE,
+    ttl_s=settings.RESPONSE_CACHE_TTL_S,
+)
+
+
+@on_menu_change
+def _invalidate_on_menu_change(version: int) -> None:
+    response_cache.invalidate_local()
@@ -0,0 +1,67 @@
+import logging
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from app.settings import settings
+
+log = logging.getLogger("chat.context")
+
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_encoding = None
+
+
+def warm_up() -> None:
+    # tiktoken may need to fetch its BPE file; do it at startup, never per request
+    global _encoding
+    try:
+        import tiktoken
+
+        _encoding = tiktoken.get_encoding("o200k_base")
+    except Exception:
+        log.warning("chat.context.tokenizer_unavailable", exc_info=True)
+
+
+def count_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def assemble_history(messages: list[dict], summary: str | None, budget: int | None = None) -> list[BaseMessage]:
+    # Rolling summary first, then as many of the most recent turns (up to
+    # HISTORY_MAX_TURNS) as fit in the token budget, oldest first.
+    budget = settings.HISTORY_TOKEN_BUDGET if budget is None else budget
+    used = 0
+    head: list[BaseMessage] = []
+    if summary:
+        cost = count_tokens(summary) + MESSAGE_OVERHEAD_TOKENS
+        if cost <= budget:
+            used = cost
+            head.append(SystemMessage(content=f"Summary of the earlier conversation: {summary}"))
+
+    recent: list[BaseMessage] = []
+    window = messages[-2 * settings.HISTORY_MAX_TURNS:] if settings.HISTORY_MAX_TURNS else []
+    for m in reversed(window):
+        cost = count_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS
+        if used + cost > budget:
+            break
+        used += cost
+        recent.append(AIMessage(content=m["content"]) if m["role"] == "assistant" else HumanMessage(content=m["content"]))
+    return head + recent[::-1]
+
+
+def history_text(history: list[BaseMessage]) -> str:
+    # For agent frameworks that take a single task string
+    labels = {"human": "User: ", "ai": "Assistant: "}
+    return "\n".join(f"{labels.get(m.type, '')}{m.content}" for m in history)
+
+
+def summary_span(total: int, window_len: int, summarized_upto: int) -> tuple[int, int] | None:
+    # Absolute [start, end) of messages that have left the verbatim window but
+    # are not yet in the summary; None until enough have accumulated.
+    end = total - 2 * settings.HISTORY_MAX_TURNS
+    start = max(summarized_upto, total - window_len)
+    if end - start < settings.SUMMARY_MIN_NEW_MESSAGES:
+        return None
+    return start, end
@@ -1,19 +1,29 @@
 from __future__ import annotations
 
-from typing import TypedDict, Literal, Any
-from sqlalchemy.orm import Session
+import logging
+from typing import TypedDict, Literal, Any, AsyncIterator, Awaitable, Callable
+import threading
+from threading import Lock
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from langgraph.graph import StateGraph, END
-from langchain_core.messages import HumanMessage
-from langchain_openai import ChatOpenAI
-
-from crewai import Agent, Task, Crew
-from autogen_agentchat.agents import AssistantAgent
-
-from app.chat.tools import get_hours, get_location, search_menu
-from app.chat.memory import load_state, save_state
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
+
+from app.chat import agents, context, llm, locks
+from app.chat.admission import AdmissionRejected, check_rate_limit, llm_slot
+from app.chat.cache import response_cache
+from app.chat.intent import INTENTS, get_classifier
+from app.chat.prefetch import Prefetch
+from app.chat.tools import get_hours, get_location, retrieve_menu
+from app.chat.memory import StaleWrite, append_messages, load_context, save_summary
+from app.db.session import AsyncSessionLocal
+from app.menu.catalog import get_catalog
+from app.observability.metrics import staged
 from app.settings import settings
 
+log = logging.getLogger("chat")
 
 class ChatState(TypedDict, total=False):
     user_id: int
@@ -21,22 +31,50 @@ class ChatState(TypedDict, total=False):
     intent: Literal["delivery", "reservation", "info", "menu"]
     input: str
     messages: list[Any]
+    history: list[BaseMessage]
     response: str
 
 
-def _llm():
-    return ChatOpenAI(model="gpt-4o-mini", api_key=settings.OPENAI_API_KEY)
-
-
-def classify_intent(state: ChatState) -> ChatState:
-    llm = _llm()
+async def llm_classify(text: str) -> str:
     prompt = (
         "Classify intent into one of: delivery, reservation, info, menu.\n"
-        f"User message: {state['input']}\nReturn only the label."
+        f"User message: {text}\nReturn only the label."
     )
-    label = llm.invoke([HumanMessage(content=prompt)]).content.strip().lower()
-    if label not in {"delivery", "reservation", "info", "menu"}:
+    async with llm_slot():
+        label = (await llm.ainvoke("classify", [HumanMessage(content=prompt)])).content.strip().lower()
+    if label not in INTENTS:
         label = "info"
+    return label
+
+
+async def _search_menu(text: str) -> list[dict]:
+    # Own session: a speculative search may be cancelled mid-query
+    async with AsyncSessionLocal() as db:
+        return await retrieve_menu(db, query=text)
+
+
+def _speculate(prefetch: Prefetch, text: str, label: str, confident: bool) -> None:
+    # Start the context the likely handlers need while the intent is settled.
+    # A confident local label only warms its own handler; an uncertain one
+    # (the LLM classifier is about to run) warms both info and menu.
+    if not confident or label == "menu":
+        prefetch.start("menu_search", lambda: _search_menu(text))
+    for intent in ("info", "menu"):
+        if not confident or label == intent:
+            prefetch.start(f"cache:{intent}", lambda intent=intent: response_cache.get(intent, text))
+
+
+def _prefetch(config: RunnableConfig | None) -> Prefetch:
+    return ((config or {}).get("configurable") or {}).get("prefetch") or Prefetch()
+
+
+@staged("classify_intent")
+async def classify_intent(state: ChatState, config: RunnableConfig) -> ChatState:
+    label, confidence = get_classifier().predict(state["input"])
+    confident = confidence >= settings.INTENT_LOCAL_THRESHOLD
+    _speculate(_prefetch(config), state["input"], label, confident)
+    if not confident:
+        label = await llm_classify(state["input"])
     state["intent"] = label  # type: ignore
     return state
 
@@ -45,79 +83,125 @@ def route(state: ChatState) -> str:
     return state.get("intent", "info")  # type: ignore
 
 
-def handle_info(state: ChatState) -> ChatState:
-    llm = _llm()
-    ctx = f"Hours: {get_hours()}\nLocation: {get_location()}\n"
-    msg = f"{ctx}\nUser: {state['input']}\nAnswer briefly and accurately."
-    out = llm.invoke([HumanMessage(content=msg)]).content
-    state["response"] = out
+@staged("admit")
+async def admit(state: ChatState) -> ChatState:
+    # The base cost was charged before classification; agent turns cost more
+    await check_rate_limit(state["user_id"], route(state))
     return state
 
 
-def handle_menu(state: ChatState, db: Session) -> ChatState:
-    llm = _llm()
-    items = search_menu(db, query=state["input"])
-    msg = (
+@staged("context")
+async def load_history(state: ChatState, config: RunnableConfig) -> ChatState:
+    # Usually started by the turn before classification and ready by now
+    user_id, conversation_id = state["user_id"], state["conversation_id"]
+    messages, meta = await _prefetch(config).take("history", lambda: load_context(user_id, conversation_id))
+    state["messages"] = [*messages, {"role": "user", "content": state["input"]}]
+    state["history"] = context.assemble_history(messages, meta.get("summary"))
+    return state
+
+
+async def _info_prompt(state: ChatState) -> str:
+    ctx = f"Hours: {get_hours()}\nLocation: {get_location()}\n"
+    return f"{ctx}\nUser: {state['input']}\nAnswer briefly and accurately."
+
+
+@staged("menu_search")
+async def _menu_prompt(state: ChatState, db: AsyncSession, prefetch: Prefetch) -> str:
+    items = await prefetch.take("menu_search", lambda: retrieve_menu(db, query=state["input"]))
+    return (
         "You are a restaurant assistant. Use the following menu search results.\n"
         f"Results: {items}\n"
         "Recommend up to 3 items and ask a clarification if needed."
     )
-    out = llm.invoke([HumanMessage(content=msg)]).content
-    state["response"] = out
+
+
+def _with_history(state: ChatState, prompt: str) -> list[BaseMessage]:
+    return [*state.get("history", []), HumanMessage(content=prompt)]
+
+
+def _agent_input(state: ChatState) -> str:
+    history = state.get("history")
+    if not history:
+        return state["input"]
+    return f"Conversation so far:\n{context.history_text(history)}\n\nLatest user message: {state['input']}"
+
+
+def _shared_cache(state: ChatState) -> bool:
+    # The response cache is shared by all users and keyed on the message
+    # alone, so only answers given without any history or summary may use it.
+    return not state.get("history")
+
+
+async def _cached_answer(
+    intent: str, state: ChatState, prefetch: Prefetch, prompt: Callable[[], Awaitable[str]],
+) -> str:
+    shared = _shared_cache(state)
+    out = await prefetch.take(f"cache:{intent}", lambda: response_cache.get(intent, state["input"])) if shared else None
+    if out is None:
+        messages = _with_history(state, await prompt())
+        async with llm_slot(intent):
+            out = (await llm.ainvoke(intent, messages)).content
+        if shared:
+            await response_cache.set(intent, state["input"], out)
+    return out
+
+
+@staged("info")
+async def handle_info(state: ChatState, config: RunnableConfig) -> ChatState:
+    state["response"] = await _cached_answer("info", state, _prefetch(config), lambda: _info_prompt(state))
     return state
 
 
-def handle_delivery_with_crewai(state: ChatState) -> ChatState:
-    sales_agent = Agent(
-        role="Sales Agent",
-        goal="Increase conversions while respecting user preferences.",
-        backstory="Expert at upsell combos and confirming order details.",
-        verbose=False,
-    )
-    task = Task(
-        description=(
-            f"User wants delivery/order help. Message: {state['input']}. "
-            "Ask for missing details: address, items, customizations, payment instructions."
-        ),
-        expected_output="A clear, step-by-step message confirming cart and next questions.",
-        agent=sales_agent,
-    )
-    crew = Crew(agents=[sales_agent], tasks=[task], verbose=False)
-    result = crew.kickoff()
+@staged("menu")
+async def handle_menu(state: ChatState, config: RunnableConfig) -> ChatState:
+    db, prefetch = config["configurable"]["db"], _prefetch(config)
+    state["response"] = await _cached_answer("menu", state, prefetch, lambda: _menu_prompt(state, db, prefetch))
+    return state
+
+
+@staged("delivery")
+async def handle_delivery_with_crewai(state: ChatState, config: RunnableConfig) -> ChatState:
+    # The agent's cart tool prices against the in-process catalog; bring it
+    # up to the current menu version first (a stale one beats none).
+    try:
+        await get_catalog(config["configurable"]["db"])
+    except SQLAlchemyError:
+        log.warning("chat.catalog.refresh_failed", exc_info=True)
+    crew = await agents.delivery_crew()
+    async with llm_slot("delivery"), llm.guarded():
+        result = await crew.kickoff_async(inputs={"message": _agent_input(state)})
     state["response"] = str(result)
     return state
 
 
-def handle_reservation_with_autogen(state: ChatState) -> ChatState:
+@staged("reservation")
+async def handle_reservation_with_autogen(state: ChatState) -> ChatState:
     # Minimal AutoGen AgentChat usage (no Console, no legacy autogen.* imports)
-    agent = AssistantAgent(
-        name="ReservationAgent",
-        system_message=(
-            "You book restaurant tables. Ask for date, time, party size, name, phone (optional). "
-            "Confirm details at the end."
-        ),
-        model="gpt-4o-mini",
-        api_key=settings.OPENAI_API_KEY,
-    )
+    agent = await agents.reservation_agent()
 
     # Keep it simple: one-turn response
-    reply = agent.run(state["input"])
-    state["response"] = str(reply)
+    async with llm_slot("reservation"), llm.guarded():
+        result = await agent.run(task=_agent_input(state))
+    state["response"] = str(result.messages[-1].content)
     return state
 
 
-def build_graph(db: Session, user_id: int, conversation_id: int):
+def build_graph():
     graph = StateGraph(ChatState)
 
     graph.add_node("classify_intent", classify_intent)
+    graph.add_node("admit", admit)
+    graph.add_node("context", load_history)
     graph.add_node("info", handle_info)
     graph.add_node("delivery", handle_delivery_with_crewai)
     graph.add_node("reservation", handle_reservation_with_autogen)
-    graph.add_node("menu", lambda s: handle_menu(s, db))
+    graph.add_node("menu", handle_menu)
 
     graph.set_entry_point("classify_intent")
 
-    graph.add_conditional_edges("classify_intent", route, {
+    graph.add_edge("classify_intent", "admit")
+    graph.add_edge("admit", "context")
+    graph.add_conditional_edges("context", route, {
         "info": "info",
         "delivery": "delivery",
         "reservation": "reservation",
@@ -130,19 +214,147 @@ def build_graph(db: Session, user_id: int, conversation_id: int):
     return graph.compile()
 
 
-def run_chat_turn(db: Session, user_id: int, conversation_id: int, text: str) -> str:
-    state_cache = load_state(user_id, conversation_id)
-    messages = state_cache.get("messages", [])
-    messages.append({"role": "user", "content": text})
-
-    graph = build_graph(db, user_id, conversation_id)
-    out_state = graph.invoke({
-        "user_id": user_id,
-        "conversation_id": conversation_id,
-        "input": text,
-        "messages": messages,
-    })
-
-    messages.append({"role": "assistant", "content": out_state["response"]})
-    save_state(user_id, conversation_id, {"messages": messages})
-    return out_state["response"]
+# Compiled graphs are immutable and safe to share; per-request dependencies
+# (db session, user/conversation ids, prefetch) travel in config["configurable"].
+# The db session is a lazily connecting primary session: the graph only reads
+# the database to rebuild version-keyed menu data (search indexes, catalog).
+_graphs: dict[str, Any] = {}
+_graphs_lock = Lock()
+_builders = {"chat": build_graph}
+
+
+def get_graph(name: str = "chat"):
+    graph = _graphs.get(name)
+    if graph is None:
+        with _graphs_lock:
+            graph = _graphs.get(name)
+            if graph is None:
+                graph = _graphs[name] = _builders[name]()
+    return graph
+
+
+def warm_up() -> None:
+    context.warm_up()
+    for name in _builders:
+        get_graph(name)
+    if settings.AGENTS_WARM_UP:
+        # Off the event loop: the app serves requests while the agent
+        # frameworks load; an early agent turn waits for them instead.
+        threading.Thread(target=agents.warm_up, name="agents-warm-up", daemon=True).start()
+
+
+def _run_config(db: AsyncSession, user_id: int, conversation_id: int, prefetch: Prefetch) -> RunnableConfig:
+    return {"configurable": {"db": db, "user_id": user_id, "conversation_id": conversation_id, "prefetch": prefetch}}
+
+
+def _start_turn(user_id: int, conversation_id: int) -> Prefetch:
+    # The history load overlaps intent classification and the rate-limit check
+    prefetch = Prefetch()
+    prefetch.start("history", lambda: load_context(user_id, conversation_id))
+    return prefetch
+
+
+async def _save_turn(user_id: int, conversation_id: int, messages: list[dict], fence: int) -> None:
+    try:
+        await append_messages(user_id, conversation_id, messages, fence=fence)
+    except StaleWrite:
+        # Our lease ran out and a newer turn has written since
+        raise locks.TurnLockTimeout(409, "The conversation moved on while this message was answered", 1)
+
+
+async def run_chat_turn(db: AsyncSession, user_id: int, conversation_id: int, text: str) -> tuple[str, str]:
+    # Returns (response, intent). Turns of one conversation run one at a time,
+    # each seeing the previous turn's messages.
+    await check_rate_limit(user_id)
+    async with locks.conversation_turn(user_id, conversation_id) as fence:
+        prefetch = _start_turn(user_id, conversation_id)
+        try:
+            out_state = await get_graph().ainvoke({
+                "user_id": user_id,
+                "conversation_id": conversation_id,
+                "input": text,
+            }, config=_run_config(db, user_id, conversation_id, prefetch))
+        finally:
+            prefetch.cancel_rest()
+
+        user_msg = {"role": "user", "content": text}
+        await _save_turn(user_id, conversation_id, [user_msg, {"role": "assistant", "content": out_state["response"]}], fence)
+    return out_state["response"], out_state["intent"]
+
+
+async def stream_chat_turn(
+    db: AsyncSession, user_id: int, conversation_id: int, text: str,
+) -> AsyncIterator[tuple[str, str]]:
+    # Yields ("intent", label), then ("token", chunk)..., then ("done", response).
+    # info/menu answers stream token by token; the agent handlers have no token
+    # stream, so their full reply goes out as a single chunk.
+    # The conversation stays locked until the generator finishes or is closed.
+    await check_rate_limit(user_id)
+    async with locks.conversation_turn(user_id, conversation_id) as fence:
+        prefetch = _start_turn(user_id, conversation_id)
+        config = _run_config(db, user_id, conversation_id, prefetch)
+        try:
+            state: ChatState = {"user_id": user_id, "conversation_id": conversation_id, "input": text}
+            state = await classify_intent(state, config)
+            state = await admit(state)
+            state = await load_history(state, config)
+            intent = route(state)
+            yield "intent", intent
+
+            shared = _shared_cache(state)
+            cached = await prefetch.take(f"cache:{intent}", lambda: response_cache.get(intent, text)) if shared else None
+            if cached is not None:
+                response = cached
+                yield "token", response
+            elif intent in ("info", "menu"):
+                prompt = await (_info_prompt(state) if intent == "info" else _menu_prompt(state, db, prefetch))
+                parts: list[str] = []
+                async with llm_slot(intent):
+                    async for chunk in llm.astream(intent, _with_history(state, prompt)):
+                        if chunk.content:
+                            parts.append(chunk.content)
+                            yield "token", chunk.content
+                response = "".join(parts)
+                if shared:
+                    await response_cache.set(intent, text, response)
+            else:
+                handled = (
+                    handle_delivery_with_crewai(state, config) if intent == "delivery"
+                    else handle_reservation_with_autogen(state)
+                )
+                response = (await handled)["response"]
+                yield "token", response
+        finally:
+            prefetch.cancel_rest()
+
+        user_msg = {"role": "user", "content": text}
+        await _save_turn(user_id, conversation_id, [user_msg, {"role": "assistant", "content": response}], fence)
+        yield "done", response
+
+
+@staged("summarize")
+async def summarize_conversation(user_id: int, conversation_id: int) -> None:
+    # Runs after the response is sent; folds turns that have left the verbatim
+    # history window into the rolling summary.
+    try:
+        messages, meta = await load_context(user_id, conversation_id)
+        total = int(meta.get("total", len(messages)))
+        span = context.summary_span(total, len(messages), int(meta.get("summarized_upto", 0)))
+        if span is None:
+            return
+        start, end = span
+        first = total - len(messages)
+        turns = "\n".join(f"{m['role']}: {m['content']}" for m in messages[start - first:end - first])
+        prompt = (
+            "Update the running summary of a restaurant assistant conversation. Keep facts the "
+            "assistant will need later (order items, addresses, reservation details, preferences). "
+            f"Reply with the summary only, at most {settings.SUMMARY_MAX_TOKENS} tokens.\n\n"
+            f"Current summary: {meta.get('summary') or '(none)'}\n\nNew messages:\n{turns}"
+        )
+        async with llm_slot():
+            summary = (await llm.ainvoke("summary", [SystemMessage(content=prompt)])).content.strip()
+        await save_summary(user_id, conversation_id, summary, end)
+    except AdmissionRejected:
+        pass  # under load; the span is picked up again after a later turn
+    except Exception:
+        log.exception("chat.summary.failed", extra={"user_id": user_id, "correlation_id": f"conv:{conversation_id}"})
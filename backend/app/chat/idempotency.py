@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+import uuid
+from collections import Counter
+
+import orjson
+from redis import RedisError
+
+from app.chat.memory import user_key
+from app.messaging.redis import async_redis_client
+from app.settings import settings
+
+log = logging.getLogger("chat.idempotency")
+
+# Idempotency-Key support for chat turns. The first request with a key claims
+# it with an in-flight marker (SET NX, leased so a crashed worker cannot hold
+# it forever); duplicates arriving meanwhile wait for that execution instead
+# of starting their own, and later retries replay the stored result until
+# IDEMPOTENCY_TTL_S. Waiters in the same process are woken directly; across
+# replicas they poll the key.
+#
+# Record: {"state": "pending"|"done", "fp": sha256(request), "token": owner, "result": {...}}
+
+stats: Counter = Counter()
+
+# KEYS[1] = record key, ARGV[1] = pending record we wrote, ARGV[2] = new value or "", ARGV[3] = ttl ms
+_FINISH = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then return 0 end
+if ARGV[2] == '' then
+  redis.call('DEL', KEYS[1])
+else
+  redis.call('SET', KEYS[1], ARGV[2], 'PX', ARGV[3])
+end
+return 1
+"""
+_finish = async_redis_client.register_script(_FINISH)
+
+_local: dict[str, asyncio.Event] = {}
+
+
+class IdempotencyConflict(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: float | None = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = None if retry_after is None else max(1, math.ceil(retry_after))
+
+    @property
+    def headers(self) -> dict[str, str] | None:
+        return None if self.retry_after is None else {"Retry-After": str(self.retry_after)}
+
+
+def fingerprint(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+def record_key(user_id: int, scope: str, key: str) -> str:
+    return f"{user_key(user_id)}:idem:{scope}:{key}"
+
+
+class Lease:
+    # Held by the one request executing for a key
+    def __init__(self, key: str, pending: bytes):
+        self.key = key
+        self.pending = pending
+        self.done = False
+
+    async def _finish(self, value: bytes, ttl_s: float) -> None:
+        if self.done:
+            return
+        self.done = True
+        try:
+            await _finish(keys=[self.key], args=[self.pending, value, int(ttl_s * 1000)])
+        except RedisError:
+            stats["errors"] += 1
+            log.warning("chat.idempotency.finish_failed", exc_info=True)
+        finally:
+            event = _local.pop(self.key, None)
+            if event is not None:
+                event.set()
+
+    async def complete(self, result: dict) -> None:
+        record = orjson.loads(self.pending)
+        record.update(state="done", result=result)
+        await self._finish(orjson.dumps(record), settings.IDEMPOTENCY_TTL_S)
+
+    async def release(self) -> None:
+        # The execution failed or was rejected: drop the marker so a retry
+        # runs again rather than replaying an error.
+        await self._finish(b"", 0)
+
+
+async def acquire(key: str, fp: str) -> Lease | dict | None:
+    # Returns a Lease when this request should execute, the stored result
+    # when it is a replay, or None when Redis is unavailable (fail open).
+    pending = orjson.dumps({"state": "pending", "fp": fp, "token": uuid.uuid4().hex})
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_S
+    delay = 0.025
+    try:
+        while True:
+            if await async_redis_client.set(key, pending, nx=True, px=int(settings.IDEMPOTENCY_LOCK_TTL_S * 1000)):
+                stats["executed"] += 1
+                _local[key] = asyncio.Event()
+                return Lease(key, pending)
+            raw = await async_redis_client.get(key)
+            if raw is None:
+                continue  # expired or released in between; try to claim it
+            record = orjson.loads(raw)
+            if record["fp"] != fp:
+                stats["mismatch"] += 1
+                raise IdempotencyConflict(422, "Idempotency-Key was already used with a different request")
+            if record["state"] == "done":
+                stats["replayed"] += 1
+                return record["result"]
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                stats["wait_timeout"] += 1
+                raise IdempotencyConflict(409, "A request with this Idempotency-Key is still in progress", 1)
+            stats["waited"] += 1
+            event = _local.get(key)
+            if event is not None:
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(min(delay, remaining))
+                delay = min(delay * 2, 0.5)
+    except RedisError:
+        stats["errors"] += 1
+        log.warning("chat.idempotency.unavailable", exc_info=True)
+        return None
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Iterable
+
+from app.settings import settings
+
+INTENTS = ("delivery", "reservation", "info", "menu")
+
+NGRAM_RANGE = (2, 3, 4)
+RULE_CONFIDENCE = 0.95
+
+_RULES = {
+    "delivery": [
+        r"\bdeliver(y|ed|ing)?\b", r"\btake ?out\b", r"\bto ?go\b", r"\bpick ?up\b",
+        r"\bcart\b", r"\bcheckout\b", r"\bmy order\b", r"\bplace an? order\b", r"\bship\b",
+    ],
+    "reservation": [
+        r"\breserv(e|ation|ations)\b", r"\bbook(ing)?\b", r"\btable for\b",
+        r"\bparty of\b", r"\bseat(s|ing)?\b", r"\bcancel my (reservation|booking)\b",
+    ],
+    "info": [
+        r"\bopen(ing)?\b", r"\bclos(e|ed|es|ing)\b", r"\bhours?\b", r"\bwhere\b",
+        r"\blocat(ed|ion)\b", r"\baddress\b", r"\bparking\b", r"\bphone\b", r"\bwi-?fi\b",
+    ],
+    "menu": [
+        r"\bmenu\b", r"\bvegan\b", r"\bvegetarian\b", r"\bgluten\b", r"\ballerg(y|ies|en|ens)\b",
+        r"\bdish(es)?\b", r"\brecommend\b", r"\bspicy\b", r"\bdessert(s)?\b", r"\bdrinks?\b",
+        r"\bwhat do you (have|serve)\b",
+    ],
+}
+_COMPILED_RULES = {k: re.compile("|".join(v)) for k, v in _RULES.items()}
+_WS = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    return _WS.sub(" ", text.lower()).strip()
+
+
+def rule_matches(text: str) -> set[str]:
+    t = normalize(text)
+    return {intent for intent, rx in _COMPILED_RULES.items() if rx.search(t)}
+
+
+def ngrams(text: str) -> Iterable[str]:
+    t = f" {normalize(text)} "
+    for n in NGRAM_RANGE:
+        for i in range(len(t) - n + 1):
+            yield t[i:i + n]
+
+
+class NgramModel:
+    # Multinomial naive Bayes over character n-grams. Weights are per-feature
+    # log-likelihood vectors aligned with INTENTS, so scoring a message is a
+    # handful of dict lookups and additions.
+
+    def __init__(self, priors: list[float], weights: dict[str, list[float]], unseen: list[float]):
+        self.priors = priors
+        self.weights = weights
+        self.unseen = unseen
+
+    @classmethod
+    def train(cls, samples: Iterable[tuple[str, str]], alpha: float = 0.5) -> "NgramModel":
+        counts: dict[str, Counter] = defaultdict(Counter)
+        docs: Counter = Counter()
+        for text, label in samples:
+            if label not in INTENTS:
+                continue
+            docs[label] += 1
+            counts[label].update(ngrams(text))
+
+        vocab = set().union(*counts.values()) if counts else set()
+        total_docs = sum(docs.values()) or 1
+        priors = [math.log((docs[c] + 1) / (total_docs + len(INTENTS))) for c in INTENTS]
+        denoms = [sum(counts[c].values()) + alpha * (len(vocab) + 1) for c in INTENTS]
+        unseen = [math.log(alpha / d) for d in denoms]
+        weights = {
+            f: [math.log((counts[c][f] + alpha) / denoms[i]) for i, c in enumerate(INTENTS)]
+            for f in vocab
+        }
+        return cls(priors, weights, unseen)
+
+    def probabilities(self, text: str) -> list[float]:
+        scores = list(self.priors)
+        weights, unseen = self.weights, self.unseen
+        for f in ngrams(text):
+            # N-grams never seen in training get the smoothed (alpha) weight,
+            # which favours intents with less training text
+            w = weights.get(f, unseen)
+            for i in range(len(scores)):
+                scores[i] += w[i]
+        top = max(scores)
+        exp = [math.exp(s - top) for s in scores]
+        z = sum(exp)
+        return [e / z for e in exp]
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"intents": INTENTS, "ngram_range": NGRAM_RANGE, "priors": self.priors,
+                       "unseen": self.unseen, "weights": self.weights}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "NgramModel":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if tuple(data["intents"]) != INTENTS or tuple(data["ngram_range"]) != NGRAM_RANGE:
+            raise ValueError(f"Intent model at {path} was trained with a different label set or n-gram range")
+        return cls(data["priors"], data["weights"], data["unseen"])
+
+
+class LocalIntentClassifier:
+    def __init__(self, model: NgramModel | None = None):
+        self.model = model
+
+    def predict(self, text: str) -> tuple[str, float]:
+        matched = rule_matches(text)
+        if len(matched) == 1:
+            return next(iter(matched)), RULE_CONFIDENCE
+
+        if self.model is None:
+            # Ambiguous or unmatched and no trained model: let the LLM decide.
+            return (next(iter(matched)) if matched else "info"), 0.0
+
+        probs = self.model.probabilities(text)
+        if matched:
+            # Several rules fired; only trust the model among the matched labels.
+            probs = [p if c in matched else 0.0 for c, p in zip(INTENTS, probs)]
+            z = sum(probs) or 1.0
+            probs = [p / z for p in probs]
+        best = max(range(len(INTENTS)), key=probs.__getitem__)
+        return INTENTS[best], probs[best]
+
+
+@lru_cache(maxsize=1)
+def get_classifier() -> LocalIntentClassifier:
+    model = NgramModel.load(settings.INTENT_MODEL_PATH) if settings.INTENT_MODEL_PATH else None
+    return LocalIntentClassifier(model)
@@ -0,0 +1,270 @@
+import asyncio
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable
+
+import httpx
+import openai
+from langchain_core.messages import BaseMessage, BaseMessageChunk
+from langchain_openai import ChatOpenAI
+
+from app.chat.admission import AdmissionRejected
+from app.observability import metrics, tracing
+from app.settings import settings
+
+log = logging.getLogger("chat.llm")
+
+# Process-wide LLM access. All chat models share one keep-alive HTTP pool;
+# model and timeout are configured per purpose (classify, info, menu,
+# delivery, reservation, summary) with a "default" fallback.
+
+RETRYABLE = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError, asyncio.TimeoutError)
+
+stats: Counter = Counter()
+
+
+def model_for(purpose: str) -> str:
+    return settings.LLM_MODELS.get(purpose) or settings.LLM_MODELS["default"]
+
+
+def timeout_for(purpose: str) -> float:
+    return settings.LLM_TIMEOUTS_S.get(purpose) or settings.LLM_TIMEOUTS_S["default"]
+
+
+class CircuitBreaker:
+    # Opens after `threshold` consecutive provider failures; while open, calls
+    # fail fast. After the cooldown one probe is let through (half-open) and its
+    # outcome closes or re-opens the circuit.
+    def __init__(self, threshold: int, cooldown_s: float):
+        self.threshold = threshold
+        self.cooldown_s = cooldown_s
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.cooldown_s else "open"
+
+    def check(self) -> bool:
+        # True when this call is the half-open probe: the caller must then
+        # release() the slot when it ends, whatever the outcome.
+        state = self.state
+        if state == "closed":
+            return False
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        stats["breaker_rejected"] += 1
+        retry = self.cooldown_s - (time.monotonic() - self.opened_at) if state == "open" else 1
+        raise AdmissionRejected(503, "LLM provider unavailable", retry)
+
+    def success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def release(self) -> None:
+        # A probe that ended without a verdict (cancelled, or an error that
+        # says nothing about the provider): the next call probes instead.
+        self._probing = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.failures >= self.threshold or self.opened_at is not None:
+            if self.opened_at is None:
+                log.warning("chat.llm.circuit_open")
+            self.opened_at = time.monotonic()
+
+
+breaker = CircuitBreaker(settings.LLM_BREAKER_THRESHOLD, settings.LLM_BREAKER_COOLDOWN_S)
+
+_http: httpx.AsyncClient | None = None
+
+
+def http_client() -> httpx.AsyncClient:
+    global _http
+    if _http is None:
+        _http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_POOL_KEEPALIVE,
+                keepalive_expiry=60,
+            ),
+            timeout=httpx.Timeout(settings.LLM_TIMEOUTS_S["default"], connect=5.0),
+        )
+    return _http
+
+
+async def aclose() -> None:
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+    chat_model.cache_clear()
+    autogen_client.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def chat_model(purpose: str) -> ChatOpenAI:
+    # Retries are ours (jittered, breaker-aware), so the SDK's are off
+    return ChatOpenAI(
+        model=model_for(purpose),
+        api_key=settings.OPENAI_API_KEY,
+        base_url=settings.OPENAI_BASE_URL,
+        timeout=timeout_for(purpose),
+        max_retries=0,
+        http_async_client=http_client(),
+        stream_usage=True,  # token counts for streamed answers
+    )
+
+
+@lru_cache(maxsize=None)
+def autogen_client(purpose: str):
+    from autogen_ext.models.openai import OpenAIChatCompletionClient
+
+    kwargs = {"base_url": settings.OPENAI_BASE_URL} if settings.OPENAI_BASE_URL else {}
+    return OpenAIChatCompletionClient(
+        model=model_for(purpose),
+        api_key=settings.OPENAI_API_KEY,
+        timeout=timeout_for(purpose),
+        max_retries=settings.LLM_MAX_RETRIES,
+        **kwargs,
+    )
+
+
+@lru_cache(maxsize=None)
+def crewai_llm(purpose: str):
+    # CrewAI goes through litellm, which keeps its own pooled clients
+    from crewai import LLM
+
+    return LLM(
+        model=model_for(purpose),
+        api_key=settings.OPENAI_API_KEY,
+        base_url=settings.OPENAI_BASE_URL,
+        timeout=timeout_for(purpose),
+        max_retries=settings.LLM_MAX_RETRIES,
+    )
+
+
+def _backoff(attempt: int) -> float:
+    # Full jitter
+    return random.uniform(0, min(settings.LLM_RETRY_MAX_S, settings.LLM_RETRY_BASE_S * 2 ** attempt))
+
+
+async def _hedged(call: Callable[[], Awaitable], after: float):
+    # Fire a second identical request if the first is slower than `after`;
+    # the first successful answer wins and the other is cancelled.
+    first = asyncio.create_task(call())
+    done, _ = await asyncio.wait({first}, timeout=after)
+    if done:
+        return first.result()
+    stats["hedged"] += 1
+    pending = {first, asyncio.create_task(call())}
+    error: BaseException | None = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        stats["hedge_won"] += 1
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def ainvoke(purpose: str, messages: list[BaseMessage]) -> BaseMessage:
+    model = chat_model(purpose)
+    hedge_after = settings.LLM_HEDGE_AFTER_S.get(purpose)
+    for attempt in range(settings.LLM_MAX_RETRIES + 1):
+        probe = breaker.check()
+        started = time.perf_counter()
+        try:
+            with tracing.span(f"llm.{purpose}", attempt=attempt):
+                if hedge_after and breaker.state == "closed":
+                    out = await _hedged(lambda: model.ainvoke(messages), hedge_after)
+                else:
+                    out = await model.ainvoke(messages)
+        except RETRYABLE as e:
+            metrics.observe_llm(purpose, started, type(e))
+            breaker.failure()
+            probe = False  # failure() settled it; do not free a later probe's slot
+            stats[f"error:{purpose}"] += 1
+            if attempt == settings.LLM_MAX_RETRIES:
+                raise
+            stats["retries"] += 1
+            await asyncio.sleep(_backoff(attempt))
+            continue
+        finally:
+            if probe:
+                breaker.release()
+        metrics.observe_llm(purpose, started, message=out)
+        breaker.success()
+        return out
+    raise AssertionError("unreachable")
+
+
+async def astream(purpose: str, messages: list[BaseMessage]) -> AsyncIterator[BaseMessageChunk]:
+    # Retried only until the first chunk arrives; after that a failure
+    # propagates, since part of the answer has already gone to the client.
+    model = chat_model(purpose)
+    for attempt in range(settings.LLM_MAX_RETRIES + 1):
+        probe = breaker.check()
+        started = False
+        t0, usage = time.perf_counter(), None
+        try:
+            with tracing.span(f"llm.{purpose}", current=False, attempt=attempt, stream=True):
+                async for chunk in model.astream(messages):
+                    if not started:
+                        metrics.LLM_TTFT_SECONDS.labels(purpose).observe(time.perf_counter() - t0)
+                        started = True
+                    if chunk.usage_metadata:
+                        usage = chunk
+                    yield chunk
+        except RETRYABLE as e:
+            metrics.observe_llm(purpose, t0, type(e))
+            breaker.failure()
+            probe = False  # failure() settled it; do not free a later probe's slot
+            stats[f"error:{purpose}"] += 1
+            if started or attempt == settings.LLM_MAX_RETRIES:
+                raise
+            stats["retries"] += 1
+            await asyncio.sleep(_backoff(attempt))
+            continue
+        finally:
+            if probe:
+                breaker.release()
+        metrics.observe_llm(purpose, t0, message=usage)
+        breaker.success()
+        return
+
+
+@asynccontextmanager
+async def guarded():
+    # For agent-framework runs, which do their own provider calls: fail fast
+    # while the circuit is open, without feeding their errors into it, except
+    # when the run is the half-open probe and its outcome decides the circuit.
+    probe = breaker.check()
+    try:
+        yield
+    except RETRYABLE:
+        if probe:
+            breaker.failure()
+        raise
+    else:
+        if probe:
+            breaker.success()
+    finally:
+        if probe:
+            breaker.release()
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+
+from redis import RedisError
+
+from app.chat.admission import AdmissionRejected
+from app.chat.memory import lock_key, meta_key
+from app.messaging.redis import async_redis_client
+from app.observability.metrics import LOCK_CONTENDED, LOCK_WAIT_SECONDS
+from app.settings import settings
+
+log = logging.getLogger("chat.locks")
+
+# Per-conversation turn serialization across replicas. A turn holds a Redis
+# lease on its conversation from loading context to appending its messages;
+# other conversations are unaffected. The lease is renewed while held, and
+# every acquisition gets a fencing token (a counter in the conversation's meta
+# hash): memory.append_messages rejects writes carrying an older token than
+# the last writer's, so a turn that stalled past its lease cannot clobber the
+# turn that took over.
+
+stats: Counter = Counter()
+
+# KEYS: lock, meta. ARGV: lease ms, meta ttl s. Returns the fence, or 0 if held.
+_ACQUIRE = """
+if redis.call('EXISTS', KEYS[1]) == 1 then return 0 end
+local fence = redis.call('HINCRBY', KEYS[2], 'lease_seq', 1)
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+redis.call('SET', KEYS[1], fence, 'PX', ARGV[1])
+return fence
+"""
+# KEYS: lock. ARGV: fence, lease ms (0 = release)
+_RENEW_OR_RELEASE = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then return 0 end
+if ARGV[2] == '0' then return redis.call('DEL', KEYS[1]) end
+return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+"""
+_acquire = async_redis_client.register_script(_ACQUIRE)
+_renew_or_release = async_redis_client.register_script(_RENEW_OR_RELEASE)
+
+# Turns waiting in this process are woken on release; other replicas poll
+_released: dict[str, asyncio.Event] = {}
+
+
+class TurnLockTimeout(AdmissionRejected):
+    pass
+
+
+async def _keep_alive(key: str, fence: int, lease_ms: int) -> None:
+    while True:
+        await asyncio.sleep(lease_ms / 3000)
+        try:
+            if not await _renew_or_release(keys=[key], args=[fence, lease_ms]):
+                stats["lease_lost"] += 1
+                log.warning("chat.locks.lease_lost", extra={"detail": key})
+                return
+        except RedisError:
+            stats["errors"] += 1
+
+
+async def _wait_for_turn(key: str, meta: str) -> int:
+    lease_ms = int(settings.TURN_LOCK_LEASE_S * 1000)
+    started = time.perf_counter()
+    deadline = started + settings.TURN_LOCK_WAIT_S
+    delay = 0.01
+    contended = False
+    while True:
+        fence = await _acquire(keys=[key, meta], args=[lease_ms, settings.MEMORY_TTL_S])
+        if fence:
+            LOCK_WAIT_SECONDS.labels("acquired").observe(time.perf_counter() - started)
+            return int(fence)
+        if not contended:
+            contended = True
+            stats["contended"] += 1
+            LOCK_CONTENDED.inc()
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            stats["timeouts"] += 1
+            LOCK_WAIT_SECONDS.labels("timeout").observe(time.perf_counter() - started)
+            raise TurnLockTimeout(409, "Another message in this conversation is still being answered", 1)
+        event = _released.get(key)
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), min(remaining, settings.TURN_LOCK_LEASE_S))
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.25)
+
+
+@asynccontextmanager
+async def conversation_turn(user_id: int, conversation_id: int):
+    # Yields the fencing token to pass to memory writes (0 when disabled or
+    # Redis is unavailable, i.e. unfenced)
+    if not settings.TURN_LOCK_ENABLED:
+        yield 0
+        return
+    key = lock_key(user_id, conversation_id)
+    try:
+        fence = await _wait_for_turn(key, meta_key(user_id, conversation_id))
+    except RedisError:
+        stats["errors"] += 1
+        log.warning("chat.locks.unavailable", exc_info=True)
+        fence = 0
+    if not fence:
+        yield 0
+        return
+
+    stats["acquired"] += 1
+    event = _released.setdefault(key, asyncio.Event())
+    renew = asyncio.create_task(_keep_alive(key, fence, int(settings.TURN_LOCK_LEASE_S * 1000)))
+    try:
+        yield fence
+    finally:
+        renew.cancel()
+        try:
+            await _renew_or_release(keys=[key], args=[fence, 0])
+        except RedisError:
+            stats["errors"] += 1  # the lease runs out on its own
+        if _released.get(key) is event:
+            del _released[key]
+        event.set()
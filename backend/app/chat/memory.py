@@ -1,15 +1,120 @@
 import json
-from redis import Redis
+import zlib
+
+import orjson
+
+from app.messaging.redis import async_redis_bytes, async_redis_client
+from app.observability.metrics import staged
 from app.settings import settings
 
-redis_client = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+# Conversation memory is a Redis list of encoded messages, appended per turn
+# and trimmed to the last MEMORY_MAX_MESSAGES, so per-turn cost is constant.
+# Each entry is a 1-byte codec tag + payload: b"j" orjson, b"z" zlib(orjson).
+_RAW = b"j"
+_ZLIB = b"z"
+
+def tenant_key(tenant: str = "default") -> str:
+    return f"chat:tenant:{tenant}"
+
+def user_key(user_id: int, tenant: str = "default") -> str:
+    return f"{tenant_key(tenant)}:user:{user_id}"
 
 def redis_key(user_id: int, conversation_id: int) -> str:
-    return f"chat:tenant:default:user:{user_id}:conv:{conversation_id}"
+    return f"{user_key(user_id)}:conv:{conversation_id}"
+
+def messages_key(user_id: int, conversation_id: int) -> str:
+    return f"{redis_key(user_id, conversation_id)}:msgs"
+
+def meta_key(user_id: int, conversation_id: int) -> str:
+    # hash: total (messages ever appended), summary, summarized_upto (absolute
+    # index), lease_seq / fence (turn lock fencing, see app/chat/locks.py)
+    return f"{redis_key(user_id, conversation_id)}:meta"
+
+def lock_key(user_id: int, conversation_id: int) -> str:
+    return f"{redis_key(user_id, conversation_id)}:lock"
+
+def encode_message(message: dict) -> bytes:
+    raw = orjson.dumps(message)
+    if len(raw) >= settings.MEMORY_COMPRESS_MIN_BYTES:
+        return _ZLIB + zlib.compress(raw, 6)
+    return _RAW + raw
+
+def decode_message(data: bytes) -> dict:
+    tag, payload = data[:1], data[1:]
+    if tag == _ZLIB:
+        payload = zlib.decompress(payload)
+    return orjson.loads(payload)
+
+async def _migrate_legacy(user_id: int, conversation_id: int) -> list[dict]:
+    # Pre-list layout: one JSON blob {"messages": [...]} at redis_key()
+    legacy = redis_key(user_id, conversation_id)
+    raw = await async_redis_client.get(legacy)
+    if not raw:
+        return []
+    messages = json.loads(raw).get("messages", [])[-settings.MEMORY_MAX_MESSAGES:]
+    if messages:
+        await append_messages(user_id, conversation_id, messages)
+    await async_redis_client.delete(legacy)
+    return messages
+
+@staged("load_context")
+async def load_context(user_id: int, conversation_id: int) -> tuple[list[dict], dict]:
+    # Message window and meta in one round trip
+    pipe = async_redis_bytes.pipeline(transaction=False)
+    pipe.lrange(messages_key(user_id, conversation_id), -settings.MEMORY_MAX_MESSAGES, -1)
+    pipe.hgetall(meta_key(user_id, conversation_id))
+    raw, meta_raw = await pipe.execute()
+    meta = {k.decode(): v.decode() for k, v in meta_raw.items()}
+    if not raw and settings.MEMORY_MIGRATE_LEGACY:
+        return await _migrate_legacy(user_id, conversation_id), await load_meta(user_id, conversation_id)
+    return [decode_message(r) for r in raw], meta
+
+class StaleWrite(Exception):
+    # A fenced write lost to a newer turn lock holder
+    pass
+
+# Appends are fenced: a turn whose lock lease expired (and was taken over by a
+# newer turn) must not write after it. KEYS: list, meta. ARGV: fence (0 =
+# unfenced), max messages, ttl, then the encoded messages.
+_APPEND = """
+local fence = tonumber(ARGV[1])
+if fence > 0 then
+  if fence < tonumber(redis.call('HGET', KEYS[2], 'fence') or '0') then return 0 end
+  redis.call('HSET', KEYS[2], 'fence', fence)
+end
+redis.call('RPUSH', KEYS[1], unpack(ARGV, 4))
+redis.call('LTRIM', KEYS[1], -tonumber(ARGV[2]), -1)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('HINCRBY', KEYS[2], 'total', #ARGV - 3)
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return 1
+"""
+_append = async_redis_bytes.register_script(_APPEND)
+
+# Summaries run outside the turn lock, so concurrent ones are ordered by the
+# span they cover: an older (shorter) summary never replaces a newer one.
+_SAVE_SUMMARY = """
+if tonumber(ARGV[2]) <= tonumber(redis.call('HGET', KEYS[1], 'summarized_upto') or '-1') then return 0 end
+redis.call('HSET', KEYS[1], 'summary', ARGV[1], 'summarized_upto', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+_save_summary = async_redis_client.register_script(_SAVE_SUMMARY)
+
+async def load_meta(user_id: int, conversation_id: int) -> dict:
+    return await async_redis_client.hgetall(meta_key(user_id, conversation_id))
 
-def load_state(user_id: int, conversation_id: int) -> dict:
-    raw = redis_client.get(redis_key(user_id, conversation_id))
-    return json.loads(raw) if raw else {}
+@staged("save_context")
+async def append_messages(user_id: int, conversation_id: int, messages: list[dict], fence: int = 0) -> None:
+    written = await _append(
+        keys=[messages_key(user_id, conversation_id), meta_key(user_id, conversation_id)],
+        args=[fence, settings.MEMORY_MAX_MESSAGES, settings.MEMORY_TTL_S, *(encode_message(m) for m in messages)],
+    )
+    if not written:
+        raise StaleWrite(f"conv:{conversation_id} fence {fence}")
 
-def save_state(user_id: int, conversation_id: int, state: dict) -> None:
-    redis_client.set(redis_key(user_id, conversation_id), json.dumps(state), ex=60 * 60 * 24)
+async def save_summary(user_id: int, conversation_id: int, summary: str, summarized_upto: int) -> bool:
+    return bool(await _save_summary(
+        keys=[meta_key(user_id, conversation_id)],
+        args=[summary, summarized_upto, settings.MEMORY_TTL_S],
+    ))
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Awaitable, Callable
+
+from app.observability.metrics import PREFETCH
+from app.settings import settings
+
+log = logging.getLogger("chat.prefetch")
+
+# Speculative context fetches for one chat turn. They start alongside intent
+# classification (history, menu search, cached answers) so their Redis/DB
+# time overlaps it; the handler that runs takes what it needs and
+# cancel_rest() drops the others. Hit rate per fetch = used / started.
+
+stats: Counter = Counter()
+
+
+class Prefetch:
+    def __init__(self):
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def start(self, name: str, fetch: Callable[[], Awaitable[Any]]) -> None:
+        if not settings.PREFETCH_ENABLED or name in self._tasks:
+            return
+        self._tasks[name] = asyncio.create_task(fetch())
+        self._count(name, "started")
+
+    async def take(self, name: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        # The prefetched result, or fetch() now if it was not started or failed
+        task = self._tasks.pop(name, None)
+        if task is None:
+            return await fetch()
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise
+            self._count(name, "failed")
+            return await fetch()
+        except Exception:
+            self._count(name, "failed")
+            log.warning("chat.prefetch.failed", exc_info=True, extra={"detail": name})
+            return await fetch()
+        self._count(name, "used")
+        return result
+
+    def cancel_rest(self) -> None:
+        for name, task in self._tasks.items():
+            if task.done() and not task.cancelled():
+                task.exception()  # retrieved, so asyncio does not log it
+            task.cancel()
+            self._count(name, "unused")
+        self._tasks.clear()
+
+    @staticmethod
+    def _count(name: str, outcome: str) -> None:
+        stats[f"{outcome}:{name}"] += 1
+        PREFETCH.labels(name, outcome).inc()
+
+
+def hit_rates() -> dict:
+    out = {}
+    for key, started in list(stats.items()):
+        outcome, name = key.split(":", 1)
+        if outcome == "started" and started:
+            out[f"hit_rate:{name}"] = round(stats[f"used:{name}"] / started, 4)
+    return out
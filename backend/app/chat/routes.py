@@ -1,12 +1,23 @@
+import json
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+import time
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.db.session import AsyncSessionLocal, async_engine, get_async_read_db, get_db
 from app.deps import get_current_user_id
 from app.db import crud
-from app.chat.schemas import CreateConversationOut, ChatIn, ChatOut
-from app.chat.graph import run_chat_turn
+from app.db.writer import WriterSaturated, message_writer
+from app.chat import idempotency
+from app.chat.admission import AdmissionRejected
+from app.chat.schemas import (
+    ChatIn, ChatOut, ConversationOut, ConversationPageOut, CreateConversationOut, LastMessageOut, MessageOut,
+    MessagePageOut,
+)
+from app.chat.graph import run_chat_turn, stream_chat_turn, summarize_conversation
 from app.messaging.kafka import emit
 
 log = logging.getLogger("chat")
@@ -21,28 +32,223 @@ def create_conversation(
     log.info("chat.conversation.created", extra={"user_id": user_id})
     return CreateConversationOut(conversation_id=conv.id)
 
+@router.get("/conversations", response_model=ConversationPageOut)
+async def list_conversations(
+    limit: int = Query(20, ge=1, le=100),
+    before: int | None = Query(None, ge=1),
+    db: AsyncSession = Depends(get_async_read_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    rows, more = await crud.list_conversations_async(db, user_id, limit, before=before)
+    return ConversationPageOut(
+        conversations=[
+            ConversationOut(
+                conversation_id=conv.id,
+                created_at=conv.created_at,
+                last_message=LastMessageOut(role=role, preview=preview, created_at=at) if role else None,
+            )
+            for conv, role, preview, at in rows
+        ],
+        next_cursor=rows[-1][0].id if more else None,
+    )
+
+def _turn_event(user_id: int, conversation_id: int, intent: str, latency_ms: int) -> dict:
+    return {
+        "user_id": user_id,
+        "conversation_id": conversation_id,
+        "type": "turn",
+        "intent": intent,
+        "latency_ms": latency_ms,
+        "ts": int(time.time() * 1000),
+    }
+
+async def _owned_conversation(db: AsyncSession, user_id: int, conversation_id: int) -> None:
+    # db may be a replica; a miss is re-checked on the primary, since a
+    # conversation created a moment ago may not have replicated yet.
+    if await crud.get_conversation_for_user_async(db, user_id=user_id, conversation_id=conversation_id):
+        return
+    if db.bind is not async_engine:
+        async with AsyncSessionLocal() as primary:
+            if await crud.get_conversation_for_user_async(primary, user_id=user_id, conversation_id=conversation_id):
+                return
+    raise HTTPException(status_code=404, detail="Conversation not found")
+
+@router.get("/conversations/{conversation_id}/messages", response_model=MessagePageOut)
+async def list_messages(
+    conversation_id: int,
+    limit: int = Query(30, ge=1, le=100),
+    before: int | None = Query(None, ge=1),
+    after: int | None = Query(None, ge=1),
+    db: AsyncSession = Depends(get_async_read_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    # Persisted history (written behind, so the latest turn may lag by a
+    # flush interval). No cursor gives the latest page; page back with
+    # ?before=older_cursor, or poll forward with ?after=<last id seen>.
+    if before is not None and after is not None:
+        raise HTTPException(status_code=422, detail="Pass either before or after, not both")
+    await _owned_conversation(db, user_id, conversation_id)
+    rows, more = await crud.list_chat_messages_page_async(db, conversation_id, limit, before=before, after=after)
+    if after is not None:
+        older = rows[0].id if rows else after
+        newer = rows[-1].id if more else None
+    else:
+        older = rows[0].id if more else None
+        newer = None if before is None else (rows[-1].id if rows else before)
+    return MessagePageOut(
+        messages=[MessageOut(id=r.id, role=r.role, content=r.content, created_at=r.created_at) for r in rows],
+        older_cursor=older,
+        newer_cursor=newer,
+    )
+
+async def _persist(user_id: int, conversation_id: int, message: str, response: str) -> None:
+    # Both rows of a turn in one enqueue. Called once the turn has run, so a
+    # saturated writer costs the stored messages but never the answer: the
+    # client (or a retry with its Idempotency-Key) still gets it.
+    try:
+        await message_writer.enqueue(conversation_id, [("user", message), ("assistant", response)])
+    except WriterSaturated:
+        log.error("chat.message.dropped", extra={"user_id": user_id, "correlation_id": f"conv:{conversation_id}"})
+
+async def _claim(user_id: int, conversation_id: int, key: str | None, message: str):
+    # None (no key, or Redis down), a Lease to execute under, or a stored result
+    if not key:
+        return None
+    try:
+        return await idempotency.acquire(
+            idempotency.record_key(user_id, f"turn:{conversation_id}", key),
+            idempotency.fingerprint(str(conversation_id), message),
+        )
+    except idempotency.IdempotencyConflict as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+
 @router.post("/conversations/{conversation_id}", response_model=ChatOut)
 async def chat_turn(
     conversation_id: int,
     body: ChatIn,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    http_response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
     user_id: int = Depends(get_current_user_id),
+    idempotency_key: str | None = Header(default=None, max_length=255),
 ):
-    conv = crud.get_conversation_for_user(db, user_id=user_id, conversation_id=conversation_id)
-    if not conv:
-        raise HTTPException(status_code=404, detail="Conversation not found")
+    await _owned_conversation(db, user_id, conversation_id)
+    # Hand the pooled connection back before the LLM call; messages are
+    # persisted by the write-behind writer.
+    await db.close()
 
-    crud.add_chat_message(db, conversation_id, "user", body.message)
+    lease = await _claim(user_id, conversation_id, idempotency_key, body.message)
+    if isinstance(lease, dict):
+        http_response.headers["Idempotent-Replayed"] = "true"
+        return ChatOut(response=lease["response"])
 
-    response = run_chat_turn(db, user_id, conversation_id, body.message)
+    started = time.perf_counter()
+    try:
+        async with AsyncSessionLocal() as graph_db:
+            response, intent = await run_chat_turn(graph_db, user_id, conversation_id, body.message)
+    except BaseException as e:
+        if lease:
+            await lease.release()
+        if isinstance(e, AdmissionRejected):
+            raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+        raise
+    latency_ms = int((time.perf_counter() - started) * 1000)
 
-    crud.add_chat_message(db, conversation_id, "assistant", response)
+    # The turn is now in the conversation memory, so from here on a retry
+    # must replay it rather than run it again.
+    if lease:
+        await lease.complete({"response": response, "intent": intent})
+    await _persist(user_id, conversation_id, body.message, response)
 
-    await emit("chat.message.created", {
-        "user_id": user_id,
-        "conversation_id": conversation_id,
-        "type": "turn",
-    })
+    await emit("chat.message.created", _turn_event(user_id, conversation_id, intent, latency_ms))
 
     log.info("chat.turn", extra={"user_id": user_id, "correlation_id": f"conv:{conversation_id}"})
+    background_tasks.add_task(summarize_conversation, user_id, conversation_id)
     return ChatOut(response=response)
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/conversations/{conversation_id}/stream")
+async def chat_turn_stream(
+    conversation_id: int,
+    body: ChatIn,
+    db: AsyncSession = Depends(get_async_read_db),
+    user_id: int = Depends(get_current_user_id),
+    idempotency_key: str | None = Header(default=None, max_length=255),
+):
+    await _owned_conversation(db, user_id, conversation_id)
+    await db.close()
+
+    # Same key space as the non-streaming endpoint, so a retry may switch
+    # between the two and still replay.
+    lease = await _claim(user_id, conversation_id, idempotency_key, body.message)
+    if isinstance(lease, dict):
+        replay = lease
+
+        async def replayed():
+            yield _sse("intent", {"intent": replay.get("intent")})
+            yield _sse("token", {"text": replay["response"]})
+            yield _sse("done", {"response": replay["response"]})
+
+        return StreamingResponse(
+            replayed(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "Idempotent-Replayed": "true"},
+        )
+
+    # The request-scoped session may already be released once the response
+    # starts, so the stream owns its own session.
+    stream_db = AsyncSessionLocal()
+    turn = stream_chat_turn(stream_db, user_id, conversation_id, body.message)
+    started = time.perf_counter()
+    try:
+        # Classification and admission run before the response starts, so a
+        # rejected turn still gets a plain 429/503 with Retry-After.
+        _, intent = await anext(turn)
+    except BaseException as e:
+        await turn.aclose()  # releases the conversation lock
+        await stream_db.close()
+        if lease:
+            await lease.release()
+        if isinstance(e, AdmissionRejected):
+            raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+        raise
+
+    async def events():
+        response = ""
+        try:
+            yield _sse("intent", {"intent": intent})
+            async for kind, value in turn:
+                if kind == "token":
+                    yield _sse("token", {"text": value})
+                else:
+                    response = value
+            if lease:
+                await lease.complete({"response": response, "intent": intent})
+        except AdmissionRejected as e:
+            yield _sse("error", {"status": e.status_code, "detail": e.detail, "retry_after": e.retry_after})
+            return
+        finally:
+            await turn.aclose()
+            await stream_db.close()
+            if lease and not lease.done:
+                # Failed, rejected or the client went away before "done"
+                await lease.release()
+
+        # Only a completed turn is persisted, so a retry after a failed or
+        # abandoned stream does not store the user message twice.
+        await _persist(user_id, conversation_id, body.message, response)
+
+        latency_ms = int((time.perf_counter() - started) * 1000)
+        await emit("chat.message.created", _turn_event(user_id, conversation_id, intent, latency_ms))
+
+        log.info("chat.turn", extra={"user_id": user_id, "correlation_id": f"conv:{conversation_id}"})
+        yield _sse("done", {"response": response})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(summarize_conversation, user_id, conversation_id),
+    )
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic import BaseModel
 
 class CreateConversationOut(BaseModel):
@@ -8,3 +10,30 @@ class ChatIn(BaseModel):
 
 class ChatOut(BaseModel):
     response: str
+
+class MessageOut(BaseModel):
+    id: int
+    role: str
+    content: str
+    created_at: datetime | None
+
+class MessagePageOut(BaseModel):
+    messages: list[MessageOut]
+    # Message ids to pass as ?before= / ?after= for the adjacent pages; null
+    # when there is nothing older / newer (yet)
+    older_cursor: int | None
+    newer_cursor: int | None
+
+class LastMessageOut(BaseModel):
+    role: str
+    preview: str
+    created_at: datetime | None
+
+class ConversationOut(BaseModel):
+    conversation_id: int
+    created_at: datetime | None
+    last_message: LastMessageOut | None
+
+class ConversationPageOut(BaseModel):
+    conversations: list[ConversationOut]
+    next_cursor: int | None  # ?before= for the next (older) page
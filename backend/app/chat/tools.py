@@ -1,5 +1,10 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import models
+from app.menu.embeddings import semantic_index
+from app.menu.search import menu_index
+
+RRF_K = 60
 
 def get_hours() -> str:
     return "Mon-Sun 11:00-23:00"
@@ -7,15 +12,31 @@ def get_hours() -> str:
 def get_location() -> str:
     return "123 Main St, Downtown"
 
-def search_menu(db: Session, query: str) -> list[dict]:
-    q = db.query(models.MenuItem).filter(models.MenuItem.active.is_(True))
-    if query:
-        q = q.filter(models.MenuItem.name.ilike(f"%{query}%"))
-    items = q.limit(10).all()
-    return [{"id": i.id, "name": i.name, "price": float(i.price), "category": i.category} for i in items]
+async def search_menu(db: AsyncSession, query: str) -> list[dict]:
+    # db is only touched when the in-process index is behind the menu version
+    await menu_index.ensure_fresh(db)
+    return menu_index.search(query, limit=10)
+
+async def semantic_search_menu(db: AsyncSession, query: str, limit: int = 10) -> list[dict]:
+    await semantic_index.ensure_fresh(db)
+    if not query.strip():
+        return []
+    return semantic_index.search(await semantic_index.embed_query(query), limit=limit)
+
+async def retrieve_menu(db: AsyncSession, query: str, limit: int = 10) -> list[dict]:
+    # Reciprocal rank fusion of lexical (BM25) and semantic results
+    scores: dict[int, float] = {}
+    docs: dict[int, dict] = {}
+    for results in (await search_menu(db, query), await semantic_search_menu(db, query, limit)):
+        for rank, doc in enumerate(results):
+            scores[doc["id"]] = scores.get(doc["id"], 0.0) + 1.0 / (RRF_K + rank)
+            docs[doc["id"]] = doc
+    return [docs[i] for i in sorted(scores, key=scores.__getitem__, reverse=True)[:limit]]
 
-def get_item(db: Session, item_id: int) -> dict | None:
-    i = db.query(models.MenuItem).filter(models.MenuItem.id == item_id, models.MenuItem.active.is_(True)).first()
+async def get_item(db: AsyncSession, item_id: int) -> dict | None:
+    i = await db.scalar(
+        select(models.MenuItem).where(models.MenuItem.id == item_id, models.MenuItem.active.is_(True))
+    )
     if not i:
         return None
     return {"id": i.id, "name": i.name, "description": i.description, "allergens": i.allergens, "price": float(i.price)}
@@ -1,24 +1,7 @@
+from sqlalchemy import func, select, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.db import models
-from app.auth.security import verify_password
-
-def get_user_by_email(db: Session, email: str) -> models.User | None:
-    return db.query(models.User).filter(models.User.email == email).first()
-
-def create_user(db: Session, email: str, password_hash: str) -> models.User:
-    user = models.User(email=email, password_hash=password_hash)
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
-
-def authenticate_user(db: Session, email: str, password: str) -> models.User | None:
-    user = get_user_by_email(db, email)
-    if not user:
-        return None
-    if not verify_password(password, user.password_hash):
-        return None
-    return user
 
 def create_conversation(db: Session, user_id: int) -> models.Conversation:
     conv = models.Conversation(user_id=user_id)
@@ -27,25 +10,71 @@ def create_conversation(db: Session, user_id: int) -> models.Conversation:
     db.refresh(conv)
     return conv
 
-def get_conversation_for_user(db: Session, user_id: int, conversation_id: int) -> models.Conversation | None:
-    return (
-        db.query(models.Conversation)
-        .filter(models.Conversation.id == conversation_id, models.Conversation.user_id == user_id)
-        .first()
+# Async variants for the chat hot path (AsyncSession, never blocks the event loop)
+
+async def get_conversation_for_user_async(
+    db: AsyncSession, user_id: int, conversation_id: int,
+) -> models.Conversation | None:
+    return await db.scalar(
+        select(models.Conversation)
+        .where(models.Conversation.id == conversation_id, models.Conversation.user_id == user_id)
     )
 
-def add_chat_message(db: Session, conversation_id: int, role: str, content: str) -> models.ChatMessage:
-    msg = models.ChatMessage(conversation_id=conversation_id, role=role, content=content)
-    db.add(msg)
-    db.commit()
-    db.refresh(msg)
-    return msg
-
-def list_chat_messages(db: Session, conversation_id: int, limit: int = 30):
-    return (
-        db.query(models.ChatMessage)
-        .filter(models.ChatMessage.conversation_id == conversation_id)
-        .order_by(models.ChatMessage.id.desc())
-        .limit(limit)
-        .all()[::-1]
+async def list_chat_messages_page_async(
+    db: AsyncSession, conversation_id: int, limit: int, before: int | None = None, after: int | None = None,
+) -> tuple[list[models.ChatMessage], bool]:
+    # Keyset page on (conversation_id, id): `before` walks back to older
+    # messages, `after` forward to newer ones, neither gives the latest page.
+    # Rows come back oldest first, with whether more lie beyond the page.
+    m = models.ChatMessage
+    q = select(m).where(m.conversation_id == conversation_id)
+    if after is not None:
+        q = q.where(m.id > after).order_by(m.id)
+    else:
+        if before is not None:
+            q = q.where(m.id < before)
+        q = q.order_by(m.id.desc())
+    rows = list(await db.scalars(q.limit(limit + 1)))
+    more = len(rows) > limit
+    del rows[limit:]
+    if after is None:
+        rows.reverse()
+    return rows, more
+
+async def list_conversations_async(
+    db: AsyncSession, user_id: int, limit: int, before: int | None = None, preview_chars: int = 120,
+) -> tuple[list, bool]:
+    # Newest conversations first, each with its last message (truncated) from
+    # a LATERAL subquery: one statement per page, one index probe per row.
+    m = models.ChatMessage
+    last = (
+        select(m.role, func.substr(m.content, 1, preview_chars).label("preview"), m.created_at)
+        .where(m.conversation_id == models.Conversation.id)
+        .order_by(m.id.desc())
+        .limit(1)
+        .lateral("last_message")
+    )
+    q = (
+        select(models.Conversation, last.c.role, last.c.preview, last.c.created_at)
+        .outerjoin(last, true())
+        .where(models.Conversation.user_id == user_id)
     )
+    if before is not None:
+        q = q.where(models.Conversation.id < before)
+    rows = list(await db.execute(q.order_by(models.Conversation.id.desc()).limit(limit + 1)))
+    more = len(rows) > limit
+    return rows[:limit], more
+
+async def get_user_by_email_async(db: AsyncSession, email: str) -> models.User | None:
+    return await db.scalar(select(models.User).where(models.User.email == email))
+
+async def create_user_async(db: AsyncSession, email: str, password_hash: str) -> models.User:
+    user = models.User(email=email, password_hash=password_hash)
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+async def update_password_hash_async(db: AsyncSession, user_id: int, password_hash: str) -> None:
+    await db.execute(update(models.User).where(models.User.id == user_id).values(password_hash=password_hash))
+    await db.commit()
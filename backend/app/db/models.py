@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, Numeric, String, Text, func
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, ForeignKey, Index, Integer, Numeric, String, Text, func
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -31,14 +31,33 @@ class MenuModifier(Base):
 
 class Conversation(Base):
     __tablename__ = "conversations"
+    # Composite indexes back the keyset-paginated listings (newest first)
+    __table_args__ = (Index("ix_conversations_user_id_id", "user_id", "id"),)
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (Index("ix_chat_messages_conversation_id_id", "conversation_id", "id"),)
     id = Column(Integer, primary_key=True)
-    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), index=True, nullable=False)
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
     role = Column(String(20), nullable=False)  # user/assistant/system
     content = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# Rollups written by the analytics worker (app/analytics/worker.py)
+class ChatIntentRollup(Base):
+    __tablename__ = "chat_intent_rollups"
+    window_start = Column(DateTime(timezone=True), primary_key=True)
+    intent = Column(String(20), primary_key=True)
+    turns = Column(Integer, nullable=False, default=0)
+    latency_ms_sum = Column(BigInteger, nullable=False, default=0)
+    latency_ms_max = Column(Integer, nullable=False, default=0)
+
+class ConversationStats(Base):
+    __tablename__ = "conversation_stats"
+    conversation_id = Column(Integer, primary_key=True)  # no FK: rollups outlive deleted conversations
+    user_id = Column(Integer, index=True, nullable=False)
+    turns = Column(Integer, nullable=False, default=0)
+    last_turn_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,13 +1,163 @@
-from sqlalchemy import create_engine
+import logging
+import time
+from collections import Counter
+
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.observability.metrics import DB_POOL_CHECKOUT_SECONDS
 from app.settings import settings
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+log = logging.getLogger("db")
+
+stats: Counter = Counter()
+
+# Engines: the primary (sync and async) takes all writes and anything that
+# must read its own writes; the optional replica serves read-only requests
+# (conversation ownership checks, history and conversation listings). Data
+# keyed on the menu version (menu snapshot, search indexes, catalog) is always
+# built from the primary, since the version is bumped when the primary
+# commits and a lagging replica would bake stale rows into it. Each engine has
+# its own pool limits. A replica that fails to connect is skipped for
+# DB_REPLICA_RETRY_S, and its reads go to the primary meanwhile.
+
+
+class _TimedPool:
+    # Checkout wait time and current waiters per pool (pool_logging_name)
+    waiting = 0
+
+    def connect(self):
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            self.waiting -= 1
+            DB_POOL_CHECKOUT_SECONDS.labels(self.logging_name).observe(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def _engine_options(url: str, name: str, pool_size: int, max_overflow: int, poolclass) -> dict:
+    options = {
+        "pool_pre_ping": True,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_S,
+        "pool_recycle": settings.DB_POOL_RECYCLE_S,
+        "pool_logging_name": name,
+        "poolclass": poolclass,
+        # SQLAlchemy's compiled-statement cache
+        "query_cache_size": settings.DB_QUERY_CACHE_SIZE,
+    }
+    if make_url(url).get_driver_name() == "psycopg":
+        # psycopg prepares server-side after DB_PREPARE_THRESHOLD executions
+        # of the same statement (None turns that off, e.g. behind PgBouncer in
+        # transaction mode). Other drivers reject these arguments.
+        options["connect_args"] = {
+            "prepare_threshold": settings.DB_PREPARE_THRESHOLD,
+            "connect_timeout": settings.DB_CONNECT_TIMEOUT_S,
+        }
+    return options
+
+
+engine = create_engine(
+    settings.DATABASE_URL,
+    **_engine_options(
+        settings.DATABASE_URL, "primary_sync", settings.DB_SYNC_POOL_SIZE, settings.DB_SYNC_MAX_OVERFLOW, TimedQueuePool,
+    ),
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# psycopg 3 serves both engines from the same postgresql+psycopg:// URL
+async_engine = create_async_engine(
+    settings.DATABASE_URL,
+    **_engine_options(
+        settings.DATABASE_URL, "primary", settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW, TimedAsyncQueuePool,
+    ),
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+replica_engine = create_async_engine(
+    settings.DATABASE_REPLICA_URL,
+    **_engine_options(
+        settings.DATABASE_REPLICA_URL, "replica",
+        settings.DB_REPLICA_POOL_SIZE, settings.DB_REPLICA_MAX_OVERFLOW, TimedAsyncQueuePool,
+    ),
+) if settings.DATABASE_REPLICA_URL else None
+AsyncReadSessionLocal = async_sessionmaker(
+    replica_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False,
+) if replica_engine else AsyncSessionLocal
+
+_replica_down_until = 0.0
+
+
+def replica_available() -> bool:
+    return replica_engine is not None and time.monotonic() >= _replica_down_until
+
+
+def _mark_replica_down() -> None:
+    global _replica_down_until
+    _replica_down_until = time.monotonic() + settings.DB_REPLICA_RETRY_S
+    stats["replica_fallbacks"] += 1
+    log.warning("db.replica_unavailable", exc_info=True)
+
+
+def pool_status(engine) -> dict:
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "waiting": getattr(pool, "waiting", 0),
+    }
+
+
+def engines() -> dict:
+    # name -> sync Engine, for instrumentation and metrics
+    out = {"primary_sync": engine, "primary": async_engine.sync_engine}
+    if replica_engine is not None:
+        out["replica"] = replica_engine.sync_engine
+    return out
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    # Read-only requests: the replica when healthy, else the primary. The
+    # connection is checked out up front so a dead replica falls back here
+    # rather than failing the request.
+    if replica_available():
+        db = AsyncReadSessionLocal()
+        try:
+            await db.connection()
+        except (DBAPIError, PoolTimeout, OSError):
+            await db.close()
+            _mark_replica_down()
+        else:
+            stats["replica_reads"] += 1
+            async with db:
+                yield db
+            return
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.db import models
+from app.db.session import async_engine
+from app.settings import settings
+
+log = logging.getLogger("db.writer")
+
+_STOP = object()
+FLUSH_ATTEMPTS = 3
+# Errors caused by the rows themselves (e.g. a message for a conversation
+# deleted meanwhile): retrying cannot help, so the batch is bisected instead.
+BAD_ROWS = (IntegrityError, DataError)
+
+
+class WriterSaturated(Exception):
+    pass
+
+
+class MessageWriter:
+    # Write-behind for chat_messages: rows are queued in-process and a single
+    # flusher bulk-inserts them as multi-row INSERTs when the batch fills up or
+    # the flush interval elapses, whichever comes first.
+
+    def __init__(self, maxsize: int, batch_size: int, flush_interval_s: float, enqueue_timeout_s: float):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.enqueue_timeout_s = enqueue_timeout_s
+        self.queue: asyncio.Queue | None = None
+        self.stats: Counter = Counter()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize() if self.queue else 0
+
+    async def start(self) -> None:
+        if self._task is None:
+            self.queue = asyncio.Queue(self.maxsize)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        await self.queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def enqueue(self, conversation_id: int, messages: list[tuple[str, str]]) -> None:
+        # A turn's (role, content) messages are one queue entry, so they are
+        # accepted or shed together.
+        if self._task is None:
+            raise RuntimeError("MessageWriter is not running")
+        now = datetime.now(timezone.utc)
+        rows = [
+            {"conversation_id": conversation_id, "role": role, "content": content, "created_at": now}
+            for role, content in messages
+        ]
+        try:
+            self.queue.put_nowait(rows)
+        except asyncio.QueueFull:
+            # Backpressure: wait briefly for the flusher, then shed load
+            self.stats["backpressure"] += 1
+            try:
+                await asyncio.wait_for(self.queue.put(rows), self.enqueue_timeout_s)
+            except asyncio.TimeoutError:
+                self.stats["rejected"] += 1
+                raise WriterSaturated("chat message queue is full") from None
+        self.stats["enqueued"] += len(rows)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self.queue.get()
+            if first is _STOP:
+                break
+            batch = list(first)
+            deadline = loop.time() + self.flush_interval_s
+            while len(batch) < self.batch_size:
+                try:
+                    rows = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        rows = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if rows is _STOP:
+                    stopping = True
+                    break
+                batch.extend(rows)
+            await self._flush(batch)
+
+        # Drain whatever was queued behind the stop marker
+        rest = []
+        while not self.queue.empty():
+            rows = self.queue.get_nowait()
+            if rows is not _STOP:
+                rest.extend(rows)
+        for i in range(0, len(rest), self.batch_size):
+            await self._flush(rest[i:i + self.batch_size])
+
+    async def _flush(self, batch: list[dict]) -> None:
+        for attempt in range(1, FLUSH_ATTEMPTS + 1):
+            try:
+                async with async_engine.begin() as conn:
+                    await conn.execute(insert(models.ChatMessage).values(batch))
+                self.stats["flushes"] += 1
+                self.stats["written"] += len(batch)
+                return
+            except BAD_ROWS:
+                if len(batch) == 1:
+                    self.stats["dropped"] += 1
+                    self.stats["bad_rows"] += 1
+                    log.error(
+                        "db.writer.row_rejected", exc_info=True,
+                        extra={"correlation_id": f"conv:{batch[0]['conversation_id']}"},
+                    )
+                    return
+                # Split until the bad rows are isolated; the rest still lands
+                self.stats["bisected"] += 1
+                mid = len(batch) // 2
+                await self._flush(batch[:mid])
+                await self._flush(batch[mid:])
+                return
+            except Exception:
+                log.warning("db.writer.flush_failed", exc_info=True, extra={"attempt": attempt})
+                await asyncio.sleep(0.1 * 2 ** attempt)
+        self.stats["dropped"] += len(batch)
+        log.error("db.writer.batch_dropped", extra={"count": len(batch)})
+
+
+message_writer = MessageWriter(
+    maxsize=settings.WRITER_QUEUE_MAX,
+    batch_size=settings.WRITER_BATCH_SIZE,
+    flush_interval_s=settings.WRITER_FLUSH_INTERVAL_S,
+    enqueue_timeout_s=settings.WRITER_ENQUEUE_TIMEOUT_S,
+)
@@ -3,15 +3,16 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
 
 from app.db.session import get_db
-from app.auth.jwt import decode_token
+from app.auth.jwt import decode_token_cached
 
 bearer = HTTPBearer(auto_error=True)
 
-def get_current_user_id(
+# async so FastAPI runs it on the loop instead of hopping to the threadpool
+async def get_current_user_id(
     creds: HTTPAuthorizationCredentials = Depends(bearer),
 ) -> int:
     try:
-        payload = decode_token(creds.credentials)
+        payload = decode_token_cached(creds.credentials)
         return int(payload["sub"])
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -12,7 +12,10 @@ class JsonFormatter(logging.Formatter):
             "logger": record.name,
             "msg": record.getMessage(),
         }
-        for k in ("request_id", "user_id", "correlation_id", "path", "method", "status_code", "latency_ms"):
+        for k in (
+            "request_id", "user_id", "correlation_id", "path", "method", "status_code", "latency_ms",
+            "count", "attempt", "detail",
+        ):
             if hasattr(record, k):
                 payload[k] = getattr(record, k)
         if record.exc_info:
@@ -1,12 +1,25 @@
 import logging
 import time
 import uuid
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
+from sqlalchemy.exc import TimeoutError as PoolTimeout
 from fastapi.responses import ORJSONResponse
 
 from app.logging import configure_logging
 from app.observability.langsmith import init_langsmith
-from app.messaging.kafka import start_kafka, stop_kafka
+from app.observability import metrics, tracing
+from app.messaging.kafka import kafka_stats, start_kafka, stop_kafka
+from app.chat.graph import warm_up as warm_up_chat_graph
+from app.chat import idempotency, llm, locks, prefetch
+from app.chat.admission import admission_stats
+from app.chat.cache import response_cache
+from app.db import session as db_session
+from app.db.session import async_engine, replica_engine
+from app.db.writer import message_writer
+from app.auth.security import start_hash_pool, stop_hash_pool
+from app.menu import catalog
+from app.menu.version import start_menu_version_watcher, stop_menu_version_watcher
+from app.messaging.redis import async_redis_bytes, async_redis_client, redis_client
 
 from app.auth.routes import router as auth_router
 from app.menu.routes import router as menu_router
@@ -14,26 +27,71 @@ from app.chat.routes import router as chat_router
 
 configure_logging()
 init_langsmith()
+tracing.init_tracing()
 log = logging.getLogger("app")
 
+for name, engine in db_session.engines().items():
+    metrics.instrument_engine(engine, name)
+    metrics.register_stats(f"db_pool_{name}", lambda engine=engine: db_session.pool_status(engine))
+metrics.register_stats("db", lambda: db_session.stats)
+for client in (redis_client, async_redis_client, async_redis_bytes):
+    metrics.instrument_redis(client)
+metrics.register_stats("writer", lambda: {**message_writer.stats, "depth": message_writer.depth})
+metrics.register_stats("kafka", kafka_stats)
+metrics.register_stats("admission", admission_stats)
+metrics.register_stats("llm", lambda: {**llm.stats, "breaker_open": int(llm.breaker.state != "closed")})
+metrics.register_stats("response_cache", lambda: response_cache.stats)
+metrics.register_stats("idempotency", lambda: idempotency.stats)
+metrics.register_stats("turn_locks", lambda: locks.stats)
+metrics.register_stats("prefetch", lambda: {**prefetch.stats, **prefetch.hit_rates()})
+metrics.register_stats("catalog", lambda: catalog.stats)
+
 app = FastAPI(default_response_class=ORJSONResponse, title="Restaurant LLM Chat API")
 
 @app.on_event("startup")
 async def _startup():
     await start_kafka()
+    await message_writer.start()
+    start_hash_pool()
+    await start_menu_version_watcher()
+    warm_up_chat_graph()
     log.info("app.startup")
 
 @app.on_event("shutdown")
 async def _shutdown():
+    await message_writer.stop()
+    stop_hash_pool()
     await stop_kafka()
+    await stop_menu_version_watcher()
+    await async_redis_client.aclose()
+    await async_redis_bytes.aclose()
+    await llm.aclose()
+    await async_engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+    tracing.shutdown_tracing()
     log.info("app.shutdown")
 
 @app.middleware("http")
 async def request_logging(request: Request, call_next):
     request_id = request.headers.get("x-request-id") or str(uuid.uuid4())
+    token = tracing.request_id_var.set(request_id)
     start = time.time()
-    response = await call_next(request)
-    latency_ms = int((time.time() - start) * 1000)
+    try:
+        with tracing.span(f"{request.method} {request.url.path}") as span:
+            response = await call_next(request)
+            # Route template, not the raw path, to keep label cardinality bounded.
+            # For streaming responses this is the time to the first byte.
+            route = getattr(request.scope.get("route"), "path", None)
+            if span is not None:
+                if route:
+                    span.update_name(f"{request.method} {route}")
+                span.set_attribute("http.status_code", response.status_code)
+    finally:
+        tracing.request_id_var.reset(token)
+    elapsed = time.time() - start
+    latency_ms = int(elapsed * 1000)
+    metrics.HTTP_SECONDS.labels(request.method, route or "unmatched", response.status_code).observe(elapsed)
 
     log.info(
         "http.request",
@@ -48,6 +106,16 @@ async def request_logging(request: Request, call_next):
     response.headers["x-request-id"] = request_id
     return response
 
+@app.exception_handler(PoolTimeout)
+async def _db_pool_exhausted(request: Request, exc: PoolTimeout):
+    log.warning("db.pool_timeout", extra={"path": request.url.path})
+    return ORJSONResponse({"detail": "Server busy, retry shortly"}, status_code=503, headers={"Retry-After": "1"})
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 app.include_router(auth_router)
 app.include_router(menu_router)
 app.include_router(chat_router)
@@ -0,0 +1,219 @@
+import asyncio
+import difflib
+import logging
+import re
+from collections import Counter
+from decimal import Decimal
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import models
+from app.menu.version import get_menu_version
+
+log = logging.getLogger("menu.catalog")
+
+# The orderable menu as in-process lookup tables, rebuilt once per menu
+# version: active items with their modifiers parsed from options_json, and
+# prices in integer cents. price_cart() resolves and prices a cart against
+# it without touching the database, so the delivery agent never does the
+# arithmetic itself.
+#
+# options_json may be a list of option names (["Small", "Large"]), a list of
+# {"name", "price_delta"} objects, or a {name: price_delta} object. Choosing
+# an option costs the modifier's price_delta plus the option's own delta.
+
+MAX_QUANTITY = 99
+
+stats: Counter = Counter()
+
+
+def normalize(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", str(text).lower()).strip()
+
+
+def _cents(value) -> int:
+    return int((Decimal(str(value or 0)) * 100).to_integral_value())
+
+
+def _money(cents: int) -> float:
+    return round(cents / 100, 2)
+
+
+def parse_options(raw: str | None) -> dict[str, tuple[str, int]]:
+    # normalized option -> (label, price delta in cents)
+    try:
+        data = orjson.loads(raw) if raw else []
+        if isinstance(data, dict):
+            data = [{"name": k, "price_delta": v} for k, v in data.items()]
+        out = {}
+        for o in data:
+            name, delta = (o, 0) if isinstance(o, str) else (o["name"], o.get("price_delta", 0))
+            out[normalize(name)] = (str(name), _cents(delta))
+        return out
+    except (orjson.JSONDecodeError, TypeError, KeyError, AttributeError, ArithmeticError):
+        stats["bad_options"] += 1
+        return {}
+
+
+class Modifier:
+    __slots__ = ("id", "name", "price_delta", "options")
+
+    def __init__(self, row: models.MenuModifier):
+        self.id = row.id
+        self.name = row.name
+        self.price_delta = _cents(row.price_delta)
+        self.options = parse_options(row.options_json)
+
+
+class CatalogItem:
+    __slots__ = ("id", "name", "category", "price", "modifiers", "options")
+
+    def __init__(self, row: models.MenuItem, modifiers: list[Modifier]):
+        self.id = row.id
+        self.name = row.name
+        self.category = row.category
+        self.price = _cents(row.price)
+        self.modifiers = {normalize(m.name): m for m in modifiers}
+        # Bare option names ("large") -> the modifiers offering them
+        self.options: dict[str, list[Modifier]] = {}
+        for m in modifiers:
+            for key in m.options:
+                self.options.setdefault(key, []).append(m)
+
+
+class Catalog:
+    def __init__(self, version: int, items: list[CatalogItem]):
+        self.version = version
+        self.items = {i.id: i for i in items}
+        self.by_name: dict[str, list[int]] = {}
+        for i in items:
+            self.by_name.setdefault(normalize(i.name), []).append(i.id)
+
+    def resolve_item(self, ref) -> tuple[CatalogItem | None, str | None]:
+        # An item id or name: exact name first, then a unique partial match
+        if isinstance(ref, int) or str(ref).strip().isdigit():
+            item = self.items.get(int(ref))
+            return (item, None) if item else (None, f"No menu item with id {ref}")
+        key = normalize(ref)
+        ids = self.by_name.get(key) or [
+            i for name, found in self.by_name.items() if key and key in name for i in found
+        ]
+        if len(ids) == 1:
+            return self.items[ids[0]], None
+        if ids:
+            names = sorted({self.items[i].name for i in ids})[:5]
+            return None, f"'{ref}' matches several items: {', '.join(names)}"
+        close = difflib.get_close_matches(key, self.by_name, n=3, cutoff=0.6)
+        hint = f"; did you mean {', '.join(self.items[self.by_name[c][0]].name for c in close)}?" if close else ""
+        return None, f"'{ref}' is not on the menu{hint}"
+
+    def resolve_modifier(self, item: CatalogItem, ref: str) -> tuple[Modifier | None, str | None, str | None]:
+        # "Modifier", "Modifier: option" or a bare option name.
+        # Returns (modifier, option key, error).
+        name, _, option = str(ref).partition(":")
+        mod = item.modifiers.get(normalize(name))
+        if mod is not None:
+            key = normalize(option)
+            if key:
+                if key not in mod.options:
+                    return None, None, f"{item.name} {mod.name} options are: {_labels(mod)}"
+                return mod, key, None
+            if mod.options:
+                return None, None, f"Choose one {mod.name} option for {item.name}: {_labels(mod)}"
+            return mod, None, None
+        key = normalize(ref)
+        offered = item.options.get(key, [])
+        if len(offered) == 1:
+            return offered[0], key, None
+        if offered:
+            return None, None, f"'{ref}' is ambiguous for {item.name}: {', '.join(m.name for m in offered)}"
+        available = ", ".join(m.name for m in item.modifiers.values()) or "none"
+        return None, None, f"'{ref}' is not a modifier of {item.name} (available: {available})"
+
+
+def _labels(mod: Modifier) -> str:
+    return ", ".join(label for label, _ in mod.options.values())
+
+
+def price_cart(catalog: Catalog, lines: list[dict]) -> dict:
+    # lines: [{"item": name or id, "quantity": int, "modifiers": [str, ...]}].
+    # Every problem is reported in "errors" rather than raised, so the agent
+    # can ask the customer about it; "ok" is true only for a fully valid cart.
+    stats["priced"] += 1
+    out, errors, subtotal = [], [], 0
+    for n, line in enumerate(lines, 1):
+        item, error = catalog.resolve_item(line.get("item", ""))
+        if item is None:
+            errors.append(f"Line {n}: {error}")
+            continue
+        quantity = line.get("quantity", 1)
+        if not isinstance(quantity, int) or not 1 <= quantity <= MAX_QUANTITY:
+            errors.append(f"Line {n}: quantity for {item.name} must be between 1 and {MAX_QUANTITY}")
+            continue
+        unit, chosen, seen = item.price, [], set()
+        for ref in line.get("modifiers") or []:
+            mod, option, error = catalog.resolve_modifier(item, ref)
+            if mod is None:
+                errors.append(f"Line {n}: {error}")
+                continue
+            if mod.id in seen:
+                errors.append(f"Line {n}: {mod.name} chosen more than once for {item.name}")
+                continue
+            seen.add(mod.id)
+            label, delta = mod.options[option] if option else (None, 0)
+            unit += mod.price_delta + delta
+            chosen.append({"modifier": mod.name, "option": label, "price_delta": _money(mod.price_delta + delta)})
+        line_total = unit * quantity
+        subtotal += line_total
+        out.append({
+            "item_id": item.id,
+            "name": item.name,
+            "quantity": quantity,
+            "modifiers": chosen,
+            "unit_price": _money(unit),
+            "line_total": _money(line_total),
+        })
+    if errors:
+        stats["invalid_carts"] += 1
+    return {
+        "ok": not errors and bool(out),
+        "lines": out,
+        "subtotal": _money(subtotal),
+        "errors": errors,
+        "menu_version": catalog.version,
+    }
+
+
+_catalog: Catalog | None = None
+_lock = asyncio.Lock()
+
+
+def current() -> Catalog | None:
+    # The last built catalog, for synchronous callers (agent tools)
+    return _catalog
+
+
+async def get_catalog(db: AsyncSession) -> Catalog:
+    global _catalog
+    version = get_menu_version()
+    if _catalog is not None and _catalog.version == version:
+        return _catalog
+    async with _lock:
+        if _catalog is None or _catalog.version != version:
+            items = (await db.scalars(
+                select(models.MenuItem).where(models.MenuItem.active.is_(True)).order_by(models.MenuItem.id)
+            )).all()
+            modifiers: dict[int, list[Modifier]] = {}
+            for row in (await db.scalars(
+                select(models.MenuModifier)
+                .join(models.MenuItem, models.MenuItem.id == models.MenuModifier.item_id)
+                .where(models.MenuItem.active.is_(True))
+                .order_by(models.MenuModifier.id)
+            )).all():
+                modifiers.setdefault(row.item_id, []).append(Modifier(row))
+            _catalog = Catalog(version, [CatalogItem(i, modifiers.get(i.id, [])) for i in items])
+            stats["builds"] += 1
+            log.info("menu.catalog.built", extra={"correlation_id": f"menu:{version}"})
+    return _catalog
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import zlib
+from typing import Protocol, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import models
+from app.menu.search import tokenize
+from app.menu.version import get_menu_version
+from app.settings import settings
+
+log = logging.getLogger("menu.embeddings")
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class Embedder(Protocol):
+    name: str
+    dim: int
+    local: bool  # False when embedding makes network calls
+
+    def fit_embed(self, texts: Sequence[str]) -> tuple["Embedder", np.ndarray]: ...
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray: ...
+
+
+class HashingEmbedder:
+    # Signed feature hashing of word unigrams/bigrams and character trigrams,
+    # TF-IDF weighted per bucket and L2-normalized. Fully offline and
+    # deterministic (crc32, not the salted built-in hash).
+
+    name = "hashing"
+    local = True
+
+    def __init__(self, dim: int = 256, idf: np.ndarray | None = None):
+        self.dim = dim
+        self.idf = np.ones(dim, dtype=np.float32) if idf is None else idf
+
+    def _features(self, text: str) -> list[tuple[str, float]]:
+        words = tokenize(text)
+        feats = [(w, 1.0) for w in words]
+        feats += [(f"{a}_{b}", 0.5) for a, b in zip(words, words[1:])]
+        for w in _WORD.findall(text.lower()):
+            padded = f"#{w}#"
+            feats += [(padded[i:i + 3], 0.25) for i in range(len(padded) - 2)]
+        return feats
+
+    def _raw(self, texts: Sequence[str]) -> np.ndarray:
+        # All texts are hashed into one flat bincount over row * dim + bucket
+        idx: list[int] = []
+        weights: list[float] = []
+        for row, text in enumerate(texts):
+            base = row * self.dim
+            for feat, w in self._features(text):
+                h = zlib.crc32(feat.encode())
+                idx.append(base + h % self.dim)
+                weights.append(w if (h >> 31) & 1 else -w)
+        flat = np.bincount(idx, weights=weights, minlength=len(texts) * self.dim)
+        raw = flat.astype(np.float32).reshape(len(texts), self.dim)
+        return np.sign(raw) * np.log1p(np.abs(raw))
+
+    def _finish(self, raw: np.ndarray) -> np.ndarray:
+        raw *= self.idf
+        norms = np.linalg.norm(raw, axis=1, keepdims=True)
+        np.divide(raw, norms, out=raw, where=norms > 0)
+        return raw
+
+    def fit_embed(self, texts: Sequence[str]) -> tuple["HashingEmbedder", np.ndarray]:
+        raw = self._raw(texts)
+        df = (raw != 0).sum(axis=0)
+        fitted = HashingEmbedder(self.dim, np.log((1 + len(texts)) / (1 + df)).astype(np.float32) + 1.0)
+        return fitted, fitted._finish(raw)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return self._finish(self._raw(texts))
+
+
+class OpenAIEmbedder:
+    name = "openai"
+    local = False
+
+    def __init__(self, model: str = "text-embedding-3-small", dim: int = 512):
+        from langchain_openai import OpenAIEmbeddings
+
+        self.dim = dim
+        self._client = OpenAIEmbeddings(model=model, dimensions=dim, api_key=settings.OPENAI_API_KEY)
+
+    def fit_embed(self, texts: Sequence[str]) -> tuple["OpenAIEmbedder", np.ndarray]:
+        return self, self.embed(texts)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.asarray(self._client.embed_documents(list(texts)), dtype=np.float32).reshape(len(texts), self.dim)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+
+def make_embedder() -> Embedder:
+    if settings.MENU_EMBEDDER == "openai":
+        return OpenAIEmbedder(dim=settings.MENU_EMBEDDING_DIM)
+    return HashingEmbedder(dim=settings.MENU_EMBEDDING_DIM)
+
+
+def item_text(item: models.MenuItem) -> str:
+    parts = [item.name, item.category, item.description or ""]
+    if item.allergens:
+        parts.append(f"allergens: {item.allergens}")
+    return ". ".join(p for p in parts if p)
+
+
+def _doc(item: models.MenuItem) -> dict:
+    return {"id": item.id, "name": item.name, "price": float(item.price), "category": item.category}
+
+
+class SemanticMenuIndex:
+    # Rows of `matrix` are unit vectors, so cosine top-k is one matrix-vector
+    # product plus an argpartition.
+
+    def __init__(self, embedder: Embedder):
+        self.embedder = embedder
+        self.version = -1
+        self.matrix = np.zeros((0, embedder.dim), dtype=np.float32)
+        self.docs: list[dict] = []
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def build(self, items: Sequence[models.MenuItem], version: int) -> None:
+        embedder, matrix = self.embedder.fit_embed([item_text(i) for i in items])
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.embedder, self.matrix, self.docs, self.version = embedder, matrix, [_doc(i) for i in items], version
+
+    async def embed_query(self, query: str) -> np.ndarray:
+        if self.embedder.local:
+            return self.embedder.embed([query])[0]
+        return (await asyncio.to_thread(self.embedder.embed, [query]))[0]
+
+    def search(self, q: np.ndarray, limit: int = 10, min_score: float = 0.15) -> list[dict]:
+        n = len(self.docs)
+        if not n:
+            return []
+        scores = self.matrix @ q
+        k = min(limit, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self.docs[i] for i in top if scores[i] >= min_score]
+
+    def save(self, path: str) -> None:
+        np.save(f"{path}.npy", self.matrix)
+        meta = {"version": self.version, "embedder": self.embedder.name, "dim": self.embedder.dim, "docs": self.docs}
+        if isinstance(self.embedder, HashingEmbedder):
+            meta["idf"] = self.embedder.idf.tolist()
+        with open(f"{path}.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def load(self, path: str, version: int, mmap: bool = True) -> bool:
+        if not os.path.exists(f"{path}.json") or not os.path.exists(f"{path}.npy"):
+            return False
+        with open(f"{path}.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["version"] != version or meta["embedder"] != self.embedder.name or meta["dim"] != self.embedder.dim:
+            return False
+        embedder = self.embedder
+        if "idf" in meta and isinstance(embedder, HashingEmbedder):
+            embedder = HashingEmbedder(embedder.dim, np.asarray(meta["idf"], dtype=np.float32))
+        matrix = np.load(f"{path}.npy", mmap_mode="r" if mmap else None)
+        self.embedder, self.matrix, self.docs, self.version = embedder, matrix, meta["docs"], version
+        return True
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        version = get_menu_version()
+        if self.version == version:
+            return
+        async with self._lock:
+            if self.version == version:
+                return
+            path = settings.MENU_EMBEDDINGS_PATH
+            if path and self.load(path, version):
+                log.info("menu.embeddings.loaded", extra={"correlation_id": f"menu:{version}"})
+                return
+            items = (await db.scalars(select(models.MenuItem).where(models.MenuItem.active.is_(True)))).all()
+            # Bulk embedding is CPU-bound (or a network call for OpenAI); keep it off the loop
+            await asyncio.to_thread(self.build, items, version)
+            log.info("menu.embeddings.built", extra={"correlation_id": f"menu:{version}"})
+
+
+semantic_index = SemanticMenuIndex(make_embedder())
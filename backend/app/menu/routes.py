@@ -1,18 +1,24 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.db import models
+from fastapi import APIRouter, Depends, Header, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_async_db
 from app.menu.schemas import MenuItemOut
+from app.menu.snapshot import etag_matches, get_snapshot
 
 router = APIRouter(prefix="/menu", tags=["menu"])
 
-@router.get("", response_model=list[MenuItemOut])
-def list_menu(db: Session = Depends(get_db)):
-    items = db.query(models.MenuItem).filter(models.MenuItem.active.is_(True)).order_by(models.MenuItem.category).all()
-    return [
-        MenuItemOut(
-            id=i.id, category=i.category, name=i.name,
-            description=i.description, allergens=i.allergens, price=float(i.price)
-        )
-        for i in items
-    ]
+CACHE_CONTROL = "no-cache"  # clients may keep the body but must revalidate with the ETag
+
+@router.get("", responses={200: {"model": list[MenuItemOut]}, 304: {"description": "Not Modified"}})
+async def list_menu(
+    category: str | None = None,
+    if_none_match: str | None = Header(default=None),
+    # The primary, connected only if the snapshot needs a rebuild: the menu
+    # version is bumped after the primary commits, so a lagging replica could
+    # bake stale rows into the new version.
+    db: AsyncSession = Depends(get_async_db),
+):
+    body, etag = (await get_snapshot(db)).get(category)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import models
+from app.menu.version import changed_item_ids, get_menu_version
+
+log = logging.getLogger("menu.search")
+
+FIELD_WEIGHTS = {"name": 3.0, "category": 1.5, "description": 1.0, "allergens": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+FUZZY_MIN_SIMILARITY = 0.4
+PREFIX_SIMILARITY = 0.9
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and any are can could do does for from get give have i in is it like me my "
+    "of on or please some something the there to want what which with would you your".split()
+)
+
+
+def _stem(token: str) -> str:
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str | None) -> list[str]:
+    if not text:
+        return []
+    return [_stem(t) for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def trigrams(term: str) -> set[str]:
+    t = f"  {term} "
+    return {t[i:i + 3] for i in range(len(t) - 2)}
+
+
+class MenuSearchIndex:
+    # BM25 over weighted fields, with query terms expanded to fuzzy (trigram)
+    # and prefix matches from the index vocabulary. Postings are keyed by item
+    # id so single items can be upserted/removed without a rebuild.
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.version = -1
+        self.docs: dict[int, dict] = {}
+        self.doc_len: dict[int, float] = {}
+        self.terms: dict[int, Counter] = {}
+        self.postings: dict[str, dict[int, float]] = defaultdict(dict)
+        self.gram_index: dict[str, set[str]] = defaultdict(set)
+        self.total_len = 0.0
+        self._expansions: dict[str, list[tuple[str, float]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def upsert(self, item: models.MenuItem) -> None:
+        self.remove(item.id)
+        if not item.active:
+            return
+        tf: Counter = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(getattr(item, field)):
+                tf[term] += weight
+        self.docs[item.id] = {"id": item.id, "name": item.name, "price": float(item.price), "category": item.category}
+        self.terms[item.id] = tf
+        self.doc_len[item.id] = sum(tf.values())
+        self.total_len += self.doc_len[item.id]
+        for term, freq in tf.items():
+            if not self.postings.get(term):
+                for g in trigrams(term):
+                    self.gram_index[g].add(term)
+            self.postings[term][item.id] = freq
+        self._expansions.clear()
+
+    def remove(self, item_id: int) -> None:
+        tf = self.terms.pop(item_id, None)
+        if tf is None:
+            return
+        self.docs.pop(item_id, None)
+        self.total_len -= self.doc_len.pop(item_id, 0.0)
+        for term in tf:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(item_id, None)
+            if not posting:
+                del self.postings[term]
+                for g in trigrams(term):
+                    self.gram_index[g].discard(term)
+        self._expansions.clear()
+
+    def _expand(self, token: str) -> list[tuple[str, float]]:
+        cached = self._expansions.get(token)
+        if cached is not None:
+            return cached
+        out: dict[str, float] = {}
+        if token in self.postings:
+            out[token] = 1.0
+        if len(token) >= 3:
+            grams = trigrams(token)
+            shared: Counter = Counter()
+            for g in grams:
+                shared.update(self.gram_index.get(g, ()))
+            for term, n in shared.items():
+                if term == token:
+                    continue
+                sim = PREFIX_SIMILARITY if term.startswith(token) else n / (len(grams) + len(trigrams(term)) - n)
+                if sim >= FUZZY_MIN_SIMILARITY:
+                    out[term] = max(out.get(term, 0.0), sim)
+        self._expansions[token] = result = list(out.items())
+        return result
+
+    def search(self, query: str, limit: int = 10) -> list[dict]:
+        n_docs = len(self.docs)
+        if not n_docs:
+            return []
+        avg_len = self.total_len / n_docs
+        scores: dict[int, float] = defaultdict(float)
+        for token in set(tokenize(query)):
+            for term, sim in self._expand(token):
+                posting = self.postings[term]
+                idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                for item_id, tf in posting.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[item_id] / avg_len)
+                    scores[item_id] += sim * idf * tf * (BM25_K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+        return [self.docs[item_id] for item_id, _ in ranked]
+
+    async def rebuild(self, db: AsyncSession, version: int) -> None:
+        items = (await db.scalars(select(models.MenuItem).where(models.MenuItem.active.is_(True)))).all()
+        self._reset()
+        for item in items:
+            self.upsert(item)
+        self.version = version
+        log.info("menu.search.rebuilt", extra={"correlation_id": f"menu:{version}"})
+
+    async def refresh(self, db: AsyncSession, version: int) -> None:
+        ids = await changed_item_ids(self.version, version) if self.version >= 0 else None
+        if ids is None:
+            await self.rebuild(db, version)
+            return
+        rows = (await db.scalars(select(models.MenuItem).where(models.MenuItem.id.in_(ids)))).all() if ids else []
+        found = set()
+        for item in rows:
+            self.upsert(item)
+            found.add(item.id)
+        for item_id in ids - found:
+            self.remove(item_id)
+        self.version = version
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        version = get_menu_version()
+        if self.version == version:
+            return
+        async with self._lock:
+            if self.version != version:
+                await self.refresh(db, version)
+
+
+menu_index = MenuSearchIndex()
@@ -0,0 +1,77 @@
+import asyncio
+import hashlib
+import logging
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import models
+from app.menu.schemas import MenuItemOut
+from app.menu.version import get_menu_version
+
+log = logging.getLogger("menu.snapshot")
+
+
+def _etag(version: int, body: bytes) -> str:
+    return f'"m{version}-{hashlib.sha1(body).hexdigest()[:16]}"'
+
+
+class MenuSnapshot:
+    # The active menu serialized once per menu version: the full list plus one
+    # pre-encoded body per category, each with its own strong ETag.
+
+    def __init__(self, version: int, items: list[MenuItemOut]):
+        self.version = version
+        self.body = orjson.dumps([i.model_dump() for i in items])
+        self.etag = _etag(version, self.body)
+        by_category: dict[str, list[MenuItemOut]] = {}
+        for i in items:
+            by_category.setdefault(i.category, []).append(i)
+        self.categories: dict[str, tuple[bytes, str]] = {}
+        for category, rows in by_category.items():
+            body = orjson.dumps([i.model_dump() for i in rows])
+            self.categories[category] = (body, _etag(version, body))
+        self.empty = (b"[]", _etag(version, b"[]"))
+
+    def get(self, category: str | None = None) -> tuple[bytes, str]:
+        if category is None:
+            return self.body, self.etag
+        return self.categories.get(category, self.empty)
+
+
+_snapshot: MenuSnapshot | None = None
+_lock = asyncio.Lock()
+
+
+async def get_snapshot(db: AsyncSession) -> MenuSnapshot:
+    global _snapshot
+    version = get_menu_version()
+    if _snapshot is not None and _snapshot.version == version:
+        return _snapshot
+    async with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            rows = (await db.scalars(
+                select(models.MenuItem)
+                .where(models.MenuItem.active.is_(True))
+                .order_by(models.MenuItem.category, models.MenuItem.id)
+            )).all()
+            items = [
+                MenuItemOut(
+                    id=i.id, category=i.category, name=i.name,
+                    description=i.description, allergens=i.allergens, price=float(i.price)
+                )
+                for i in rows
+            ]
+            _snapshot = MenuSnapshot(version, items)
+            log.info("menu.snapshot.built", extra={"correlation_id": f"menu:{version}"})
+    return _snapshot
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    return any(t.strip().removeprefix("W/") == etag for t in if_none_match.split(","))
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+from threading import Lock
+from typing import Callable
+
+from redis import RedisError
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.db import models
+from app.messaging.redis import async_redis_client, redis_client
+from app.settings import settings
+
+log = logging.getLogger("menu")
+
+# A monotonically increasing menu version shared by all replicas through Redis.
+# Anything derived from the menu (caches, indexes, snapshots) keys on it and
+# subscribes with on_menu_change() to rebuild. Readers get a local copy that
+# start_menu_version_watcher() refreshes every MENU_VERSION_REFRESH_S.
+MENU_VERSION_KEY = "menu:version"
+MENU_CHANGES_KEY = "menu:changes"  # hash: version -> comma-separated changed item ids
+MENU_CHANGES_TTL_S = 60 * 60 * 24
+
+_lock = Lock()
+_version = 0
+_watcher: asyncio.Task | None = None
+_listeners: list[Callable[[int], None]] = []
+_bumps: set[asyncio.Task] = set()
+
+
+def on_menu_change(callback: Callable[[int], None]) -> Callable[[int], None]:
+    _listeners.append(callback)
+    return callback
+
+
+def _set_version(version: int) -> None:
+    global _version
+    with _lock:
+        changed = version != _version
+        _version = version
+    if changed:
+        log.info("menu.version", extra={"correlation_id": f"menu:{version}"})
+        for cb in list(_listeners):
+            try:
+                cb(version)
+            except Exception:
+                log.exception("menu.version.listener_failed")
+
+
+def get_menu_version() -> int:
+    return _version
+
+
+async def refresh_menu_version() -> int:
+    try:
+        _set_version(int(await async_redis_client.get(MENU_VERSION_KEY) or 0))
+    except RedisError:
+        log.warning("menu.version.unavailable", exc_info=True)
+    return _version
+
+
+async def _watch() -> None:
+    while True:
+        await refresh_menu_version()
+        await asyncio.sleep(settings.MENU_VERSION_REFRESH_S)
+
+
+async def start_menu_version_watcher() -> None:
+    global _watcher
+    await refresh_menu_version()
+    if _watcher is None:
+        _watcher = asyncio.create_task(_watch())
+
+
+async def stop_menu_version_watcher() -> None:
+    global _watcher
+    if _watcher:
+        _watcher.cancel()
+        _watcher = None
+
+
+def bump_menu_version(item_ids: set[int] | None = None) -> int:
+    # Without item_ids, consumers cannot refresh incrementally and rebuild fully.
+    version = int(redis_client.incr(MENU_VERSION_KEY))
+    if item_ids:
+        pipe = redis_client.pipeline()
+        pipe.hset(MENU_CHANGES_KEY, str(version), ",".join(map(str, sorted(item_ids))))
+        pipe.expire(MENU_CHANGES_KEY, MENU_CHANGES_TTL_S)
+        pipe.execute()
+    _set_version(version)
+    return version
+
+
+async def bump_menu_version_async(item_ids: set[int] | None = None) -> int:
+    version = int(await async_redis_client.incr(MENU_VERSION_KEY))
+    if item_ids:
+        pipe = async_redis_client.pipeline()
+        pipe.hset(MENU_CHANGES_KEY, str(version), ",".join(map(str, sorted(item_ids))))
+        pipe.expire(MENU_CHANGES_KEY, MENU_CHANGES_TTL_S)
+        await pipe.execute()
+    _set_version(version)
+    return version
+
+
+async def _bump_in_background(item_ids: set[int]) -> None:
+    try:
+        await asyncio.wait_for(bump_menu_version_async(item_ids), settings.MENU_VERSION_BUMP_TIMEOUT_S)
+    except (RedisError, asyncio.TimeoutError):
+        # The commit stands; menu-derived data stays on the old version until
+        # the next successful bump.
+        log.error("menu.version.bump_failed", exc_info=True)
+
+
+async def changed_item_ids(since: int, until: int) -> set[int] | None:
+    # Item ids touched by versions (since, until]; None if any version is unknown.
+    if until == since:
+        return set()
+    if until < since:
+        return None
+    raw = await async_redis_client.hmget(MENU_CHANGES_KEY, [str(v) for v in range(since + 1, until + 1)])
+    if any(r is None for r in raw):
+        return None
+    return {int(i) for r in raw for i in r.split(",") if i}
+
+
+@event.listens_for(Session, "after_flush")
+def _track_menu_writes(session: Session, flush_context) -> None:
+    # after_flush still sees the pre-flush new/dirty/deleted sets, with ids assigned
+    for o in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(o, models.MenuItem):
+            session.info.setdefault("menu_changed_ids", set()).add(o.id)
+        elif isinstance(o, models.MenuModifier):
+            session.info.setdefault("menu_changed_ids", set()).add(o.item_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session: Session) -> None:
+    item_ids = session.info.pop("menu_changed_ids", None)
+    if not item_ids:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # A sync session off the event loop (scripts, threadpool routes)
+        try:
+            bump_menu_version(item_ids)
+        except RedisError:
+            log.error("menu.version.bump_failed", exc_info=True)
+        return
+    # An AsyncSession commits on the event loop: no blocking Redis round-trip
+    # here, and a Redis failure must not surface from a commit that succeeded.
+    task = loop.create_task(_bump_in_background(item_ids))
+    _bumps.add(task)
+    task.add_done_callback(_bumps.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _reset_after_rollback(session: Session) -> None:
+    session.info.pop("menu_changed_ids", None)
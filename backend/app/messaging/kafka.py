@@ -1,25 +1,125 @@
-import json
+import asyncio
+import contextlib
+import logging
+import time
+from collections import Counter, deque
+
+import orjson
 from aiokafka import AIOKafkaProducer
+from app.observability.metrics import observe_kafka
 from app.settings import settings
 
-_producer: AIOKafkaProducer | None = None
+log = logging.getLogger("kafka")
 
-async def start_kafka():
-    global _producer
-    _producer = AIOKafkaProducer(
+_STOP = object()
+
+# One producer per ack policy (acks is a producer-level setting in Kafka)
+_producers: dict[str, AIOKafkaProducer] = {}
+_buffer: asyncio.Queue | None = None
+_sender: asyncio.Task | None = None
+
+stats: Counter = Counter()
+_latencies_ms: deque = deque(maxlen=1024)
+
+def _acks(value: str) -> int | str:
+    return "all" if value == "all" else int(value)
+
+def topic_acks(topic: str) -> str:
+    return settings.KAFKA_TOPIC_ACKS.get(topic, settings.KAFKA_DEFAULT_ACKS)
+
+def _producer(acks: str) -> AIOKafkaProducer:
+    return AIOKafkaProducer(
         bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
         client_id=settings.KAFKA_CLIENT_ID,
-        value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+        value_serializer=orjson.dumps,
+        acks=_acks(acks),
+        linger_ms=settings.KAFKA_LINGER_MS,
+        max_batch_size=settings.KAFKA_MAX_BATCH_BYTES,
+        compression_type=settings.KAFKA_COMPRESSION,
     )
-    await _producer.start()
+
+async def start_kafka():
+    global _buffer, _sender
+    for acks in {settings.KAFKA_DEFAULT_ACKS, *settings.KAFKA_TOPIC_ACKS.values()}:
+        producer = _producer(acks)
+        await producer.start()
+        _producers[acks] = producer
+    _buffer = asyncio.Queue(settings.KAFKA_BUFFER_MAX)
+    _sender = asyncio.create_task(_send_loop())
 
 async def stop_kafka():
-    global _producer
-    if _producer:
-        await _producer.stop()
-        _producer = None
+    global _buffer, _sender
+    if _sender:
+        # Drain: everything buffered before the stop marker is handed to the
+        # producers, which then flush their batches on stop().
+        await _buffer.put(_STOP)
+        done, _ = await asyncio.wait({_sender}, timeout=settings.KAFKA_DRAIN_TIMEOUT_S)
+        if not done:
+            pending = _buffer.qsize() - 1  # minus the stop marker
+            stats["dropped"] += pending
+            log.warning("kafka.drain_timeout", extra={"count": pending})
+            # Stopped before the producers, or it keeps calling send() on them
+            _sender.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await _sender
+        _sender = None
+        _buffer = None
+    for producer in _producers.values():
+        await producer.stop()
+    _producers.clear()
+
+def buffer_depth() -> int:
+    return _buffer.qsize() if _buffer else 0
+
+def kafka_stats() -> dict:
+    lat = sorted(_latencies_ms)
+    pct = lambda p: lat[min(len(lat) - 1, int(p * len(lat)))] if lat else None
+    return {
+        **stats,
+        "buffer_depth": buffer_depth(),
+        "send_latency_ms_p50": pct(0.5),
+        "send_latency_ms_p99": pct(0.99),
+    }
+
+def _on_delivery(topic: str, started: float, fut: asyncio.Future) -> None:
+    if fut.cancelled() or fut.exception() is not None:
+        stats["failed"] += 1
+        observe_kafka(topic, started, asyncio.CancelledError if fut.cancelled() else type(fut.exception()))
+        log.warning("kafka.delivery_failed", extra={"detail": "cancelled" if fut.cancelled() else repr(fut.exception())})
+        return
+    stats["delivered"] += 1
+    observe_kafka(topic, started)
+    _latencies_ms.append((time.perf_counter() - started) * 1000)
+
+async def _send_loop():
+    while True:
+        item = await _buffer.get()
+        if item is _STOP:
+            return
+        topic, event, started = item
+        try:
+            # send() only appends to the producer's batch accumulator; delivery
+            # is reported through the returned future.
+            fut = await _producers[topic_acks(topic)].send(topic, event)
+        except Exception as e:
+            stats["failed"] += 1
+            observe_kafka(topic, started, type(e))
+            log.warning("kafka.send_failed", exc_info=True)
+            continue
+        fut.add_done_callback(lambda f, t=topic, s=started: _on_delivery(t, s, f))
 
 async def emit(topic: str, event: dict):
-    if not _producer:
+    # Fire-and-forget: never waits on the broker; drops (and counts) when the
+    # local buffer is full.
+    if not _buffer:
+        return
+    try:
+        _buffer.put_nowait((topic, event, time.perf_counter()))
+        stats["enqueued"] += 1
+    except asyncio.QueueFull:
+        stats["dropped"] += 1
+
+async def emit_and_wait(topic: str, event: dict):
+    if not _producers:
         return
-    await _producer.send_and_wait(topic, event)
+    await _producers[topic_acks(topic)].send_and_wait(topic, event)
@@ -0,0 +1,8 @@
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from app.settings import settings
+
+redis_client = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+async_redis_client = AsyncRedis.from_url(settings.REDIS_URL, decode_responses=True)
+# For binary payloads (encoded chat memory)
+async_redis_bytes = AsyncRedis.from_url(settings.REDIS_URL, decode_responses=False)
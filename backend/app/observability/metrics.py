@@ -0,0 +1,202 @@
+import asyncio
+import time
+from functools import wraps
+from typing import Callable
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+
+from app.observability import tracing
+
+# Prometheus metrics for the API process, served on /metrics. Hooks are cheap
+# enough to leave on (a histogram observe is ~1us); labels are bounded: route
+# templates, stage/purpose/command names and exception class names, never
+# ids or raw paths.
+
+# From sub-millisecond Redis calls up to the LLM timeouts
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HTTP_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to response headers", ["method", "route", "status"], buckets=BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "chat_stage_duration_seconds", "Chat turn stages (graph nodes, context load/save)", ["stage", "outcome"], buckets=BUCKETS,
+)
+LLM_SECONDS = Histogram(
+    "llm_request_duration_seconds", "LLM calls, per attempt", ["purpose", "outcome"], buckets=BUCKETS,
+)
+LLM_TTFT_SECONDS = Histogram(
+    "llm_time_to_first_token_seconds", "Streaming LLM calls: time to the first chunk", ["purpose"], buckets=BUCKETS,
+)
+LLM_TOKENS = Counter("llm_tokens", "Tokens reported by the provider", ["purpose", "kind"])
+PREFETCH = Counter("chat_prefetch", "Speculative context fetches by outcome", ["name", "outcome"])
+DB_SECONDS = Histogram(
+    "db_query_duration_seconds", "SQL statements", ["engine", "operation", "outcome"], buckets=BUCKETS,
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds", "Waiting for a pooled connection", ["pool"], buckets=BUCKETS,
+)
+REDIS_SECONDS = Histogram(
+    "redis_command_duration_seconds", "Redis commands and pipelines", ["command", "outcome"], buckets=BUCKETS,
+)
+LOCK_WAIT_SECONDS = Histogram(
+    "conversation_lock_wait_seconds", "Time chat turns waited for their conversation", ["outcome"], buckets=BUCKETS,
+)
+LOCK_CONTENDED = Counter("conversation_lock_contended", "Chat turns that found their conversation busy")
+KAFKA_SECONDS = Histogram(
+    "kafka_send_duration_seconds", "Kafka events, enqueue to broker ack", ["topic", "outcome"], buckets=BUCKETS,
+)
+
+
+def outcome(exc_type: type | None) -> str:
+    return "ok" if exc_type is None else exc_type.__name__
+
+
+class _Stage:
+    __slots__ = ("name", "span", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.span = tracing.span(f"chat.{self.name}")
+        self.span.__enter__()
+        self.started = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb):
+        STAGE_SECONDS.labels(self.name, outcome(exc_type)).observe(time.perf_counter() - self.started)
+        return self.span.__exit__(exc_type, exc, tb)
+
+
+def stage(name: str) -> _Stage:
+    return _Stage(name)
+
+
+def staged(name: str) -> Callable:
+    # For async functions, including LangGraph nodes: functools.wraps keeps
+    # the signature LangGraph inspects to decide whether to pass `config`.
+    def decorate(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with _Stage(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def observe_llm(purpose: str, started: float, exc_type: type | None = None, message=None) -> None:
+    LLM_SECONDS.labels(purpose, outcome(exc_type)).observe(time.perf_counter() - started)
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        LLM_TOKENS.labels(purpose, "prompt").inc(usage.get("input_tokens", 0))
+        LLM_TOKENS.labels(purpose, "completion").inc(usage.get("output_tokens", 0))
+
+
+def observe_kafka(topic: str, started: float, exc_type: type | None = None) -> None:
+    KAFKA_SECONDS.labels(topic, outcome(exc_type)).observe(time.perf_counter() - started)
+
+
+def _operation(statement: str) -> str:
+    head = statement.lstrip()[:10].split(None, 1)
+    return head[0].upper() if head else "?"
+
+
+def instrument_engine(engine, name: str) -> None:
+    # Pass async_engine.sync_engine for async engines
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is not None:
+            DB_SECONDS.labels(name, _operation(statement), "ok").observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(ctx):
+        started = getattr(ctx.execution_context, "_metrics_started", None)
+        if started is not None and ctx.statement:
+            DB_SECONDS.labels(name, _operation(ctx.statement), outcome(type(ctx.original_exception))).observe(
+                time.perf_counter() - started
+            )
+
+
+def _timed_async(fn, command: Callable[[tuple], str]):
+    @wraps(fn)
+    async def wrapper(*args, **kwargs):
+        started, exc_type = time.perf_counter(), None
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            exc_type = type(e)
+            raise
+        finally:
+            REDIS_SECONDS.labels(command(args), outcome(exc_type)).observe(time.perf_counter() - started)
+    return wrapper
+
+
+def _timed_sync(fn, command: Callable[[tuple], str]):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        started, exc_type = time.perf_counter(), None
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            exc_type = type(e)
+            raise
+        finally:
+            REDIS_SECONDS.labels(command(args), outcome(exc_type)).observe(time.perf_counter() - started)
+    return wrapper
+
+
+def instrument_redis(client) -> None:
+    # Wraps the client instance in place, so modules that imported it by name
+    # are covered. Every command helper (and Lua scripts via EVALSHA) goes
+    # through execute_command; pipelines are timed as a whole.
+    if getattr(client, "_metrics_instrumented", False):
+        return
+    timed = _timed_async if asyncio.iscoroutinefunction(client.execute_command) else _timed_sync
+    client.execute_command = timed(client.execute_command, lambda args: str(args[0]).lower())
+    make_pipeline = client.pipeline
+
+    def pipeline(*args, **kwargs):
+        pipe = make_pipeline(*args, **kwargs)
+        pipe.execute = timed(pipe.execute, lambda args: "pipeline")
+        return pipe
+
+    client.pipeline = pipeline
+    client._metrics_instrumented = True
+
+
+class _StatsCollector:
+    # Exposes the components' own Counter/dict stats (writer, kafka, admission,
+    # llm, response cache) at scrape time.
+    def __init__(self):
+        self.sources: dict[str, Callable[[], dict]] = {}
+
+    def collect(self):
+        family = GaugeMetricFamily("app_component_stat", "Internal component counters and gauges", labels=["component", "name"])
+        for component, read in self.sources.items():
+            try:
+                values = read()
+            except Exception:
+                continue
+            for name, value in values.items():
+                if isinstance(value, (int, float)):
+                    family.add_metric([component, name], value)
+        yield family
+
+
+_stats = _StatsCollector()
+REGISTRY.register(_stats)
+
+
+def register_stats(component: str, read: Callable[[], dict]) -> None:
+    _stats.sources[component] = read
+
+
+def render() -> tuple[bytes, str]:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
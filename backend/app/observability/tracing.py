@@ -0,0 +1,78 @@
+import logging
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+from app.settings import settings
+
+log = logging.getLogger("tracing")
+
+# Optional OpenTelemetry spans. Off unless OTEL_ENABLED is set; the SDK and
+# exporter are imported only then, and while off span() returns a shared
+# no-op context manager. Every span carries the request_id of the HTTP
+# request it runs under, so traces line up with the JSON request logs.
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+_tracer = None
+_NOOP = nullcontext()
+
+
+def init_tracing() -> None:
+    global _tracer
+    if not settings.OTEL_ENABLED:
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        log.warning("tracing.otel_unavailable")
+        return
+    # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* env vars
+    provider = TracerProvider(resource=Resource.create({"service.name": settings.OTEL_SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("app")
+
+
+def shutdown_tracing() -> None:
+    if _tracer is not None:
+        from opentelemetry import trace
+
+        trace.get_tracer_provider().shutdown()
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, current: bool = True, **attributes):
+    # current=False for spans held across yields (async generators), which
+    # must not be attached to the context they were started in.
+    if _tracer is None:
+        return _NOOP
+    request_id = request_id_var.get()
+    if request_id is not None:
+        attributes["request_id"] = request_id
+    if current:
+        return _tracer.start_as_current_span(name, attributes=attributes)
+    return _DetachedSpan(_tracer.start_span(name, attributes=attributes))
+
+
+class _DetachedSpan:
+    def __init__(self, span):
+        self.span = span
+
+    def __enter__(self):
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            from opentelemetry.trace import Status, StatusCode
+
+            self.span.record_exception(exc)
+            self.span.set_status(Status(StatusCode.ERROR, str(exc)))
+        self.span.end()
+        return False
@@ -7,20 +7,136 @@ class Settings(BaseSettings):
     ENV: str = "local"
 
     DATABASE_URL: str
+    # Read replica for read-only requests (same driver URL form); unset = primary only
+    DATABASE_REPLICA_URL: str | None = None
+    DB_POOL_SIZE: int = 20  # primary, async (API hot path, writer)
+    DB_MAX_OVERFLOW: int = 10
+    DB_SYNC_POOL_SIZE: int = 5  # primary, sync (remaining sync endpoints)
+    DB_SYNC_MAX_OVERFLOW: int = 5
+    DB_REPLICA_POOL_SIZE: int = 20
+    DB_REPLICA_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_S: float = 5.0  # waiting longer for a connection is a 503
+    DB_POOL_RECYCLE_S: int = 1800
+    DB_CONNECT_TIMEOUT_S: int = 5
+    DB_REPLICA_RETRY_S: float = 30.0
+    DB_PREPARE_THRESHOLD: int | None = 5
+    DB_QUERY_CACHE_SIZE: int = 1000
     REDIS_URL: str
 
     KAFKA_BOOTSTRAP_SERVERS: str
     KAFKA_CLIENT_ID: str = "restaurant-api"
+    # Events are buffered locally and sent in the background (see messaging/kafka.py)
+    KAFKA_BUFFER_MAX: int = 10000
+    KAFKA_LINGER_MS: int = 20
+    KAFKA_MAX_BATCH_BYTES: int = 64 * 1024
+    KAFKA_COMPRESSION: str | None = "lz4"  # gzip, snappy, lz4, zstd or None
+    KAFKA_DEFAULT_ACKS: str = "1"  # "0", "1" or "all"
+    KAFKA_TOPIC_ACKS: dict[str, str] = {}  # per-topic override, e.g. {"audit.events": "all"}
+    KAFKA_DRAIN_TIMEOUT_S: float = 5.0
+
+    # Analytics worker (app/analytics/worker.py)
+    ANALYTICS_GROUP_ID: str = "chat-analytics"
+    ANALYTICS_TOPICS: list[str] = ["chat.message.created"]
+    ANALYTICS_WINDOW_S: int = 60
+    ANALYTICS_BATCH_MAX: int = 500
+    ANALYTICS_FLUSH_S: float = 10.0
+    ANALYTICS_FLUSH_EVENTS: int = 5000
 
     JWT_SECRET: str
     JWT_ISSUER: str = "restaurant-llm-chat"
     ACCESS_TOKEN_TTL_MIN: int = 15
     REFRESH_TOKEN_TTL_DAYS: int = 14
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+    BCRYPT_ROUNDS: int = 12  # changing it rehashes passwords on next login
+    AUTH_HASH_WORKERS: int = 2
+    AUTH_HASH_MAX_INFLIGHT: int = 16  # beyond this, login/signup answer 503
 
     OPENAI_API_KEY: str | None = None
+    OPENAI_BASE_URL: str | None = None  # any OpenAI-compatible endpoint, e.g. a local fake for tests
+
+    # LLM client (app/chat/llm.py). Keys are purposes: classify, info, menu,
+    # delivery, reservation, summary; "default" covers the rest.
+    LLM_MODELS: dict[str, str] = {"default": "gpt-4o-mini"}
+    LLM_TIMEOUTS_S: dict[str, float] = {"default": 30.0, "classify": 5.0, "info": 15.0, "menu": 15.0}
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BASE_S: float = 0.25
+    LLM_RETRY_MAX_S: float = 4.0
+    LLM_HEDGE_AFTER_S: dict[str, float] = {}  # e.g. {"classify": 1.0}; unset = no hedging
+    LLM_BREAKER_THRESHOLD: int = 5
+    LLM_BREAKER_COOLDOWN_S: float = 30.0
+    LLM_POOL_MAX_CONNECTIONS: int = 100
+    LLM_POOL_KEEPALIVE: int = 20
+    # Load CrewAI/AutoGen in the background at startup; false = on the first agent turn
+    AGENTS_WARM_UP: bool = True
     LANGSMITH_API_KEY: str | None = None
     LANGSMITH_PROJECT: str = "restaurant-llm-chat"
     LANGCHAIN_TRACING_V2: str | None = None
     LANGCHAIN_PROJECT: str | None = None
+    # OpenTelemetry spans (exporter configured via the standard OTEL_EXPORTER_OTLP_* env vars)
+    OTEL_ENABLED: bool = False
+    OTEL_SERVICE_NAME: str = "restaurant-api"
+
+    # Admission control for LLM-backed chat turns. Rate limits are token buckets
+    # per user and per tenant; each turn costs RATE_LIMIT_INTENT_COST[intent],
+    # the cheapest cost up front and the rest once the intent is classified.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "redis"  # "local" = in-process buckets (tests, single process)
+    RATE_LIMIT_USER_PER_MIN: float = 30.0
+    RATE_LIMIT_USER_BURST: float = 20.0
+    RATE_LIMIT_TENANT_PER_MIN: float = 3000.0
+    RATE_LIMIT_TENANT_BURST: float = 500.0
+    RATE_LIMIT_INTENT_COST: dict[str, float] = {"info": 1.0, "menu": 1.0, "delivery": 4.0, "reservation": 4.0}
+    LLM_MAX_CONCURRENCY: int = 32
+    LLM_INTENT_CONCURRENCY: dict[str, int] = {"delivery": 8, "reservation": 8}
+    LLM_QUEUE_MAX: int = 64
+    LLM_QUEUE_TIMEOUT_S: float = 5.0
+
+    # Conversation memory (Redis list per conversation)
+    MEMORY_MAX_MESSAGES: int = 50
+    MEMORY_TTL_S: int = 60 * 60 * 24
+    MEMORY_COMPRESS_MIN_BYTES: int = 512
+    MEMORY_MIGRATE_LEGACY: bool = True
+
+    # Idempotency-Key on chat turns: results replay for TTL_S; duplicates of an
+    # in-flight turn wait up to WAIT_S; LOCK_TTL_S bounds a crashed turn's marker.
+    IDEMPOTENCY_TTL_S: int = 60 * 60 * 24
+    IDEMPOTENCY_LOCK_TTL_S: float = 120.0
+    IDEMPOTENCY_WAIT_S: float = 60.0
+
+    # One turn at a time per conversation (Redis lease, renewed while held)
+    TURN_LOCK_ENABLED: bool = True
+    TURN_LOCK_LEASE_S: float = 15.0
+    TURN_LOCK_WAIT_S: float = 30.0
+
+    # Start history, menu search and cache lookups alongside intent classification
+    PREFETCH_ENABLED: bool = True
+
+    # Prompt history: recent turns verbatim within a token budget, older turns summarized
+    HISTORY_TOKEN_BUDGET: int = 1500
+    HISTORY_MAX_TURNS: int = 6
+    SUMMARY_MIN_NEW_MESSAGES: int = 6
+    SUMMARY_MAX_TOKENS: int = 250
+
+    # Local intent classification; below the threshold the LLM classifier is used
+    INTENT_MODEL_PATH: str | None = None
+    INTENT_LOCAL_THRESHOLD: float = 0.85
+
+    # info/menu answer cache (in-process LRU in front of Redis)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL_S: int = 60 * 60 * 6
+    RESPONSE_CACHE_LOCAL_SIZE: int = 2048
+    MENU_VERSION_REFRESH_S: float = 5.0
+    MENU_VERSION_BUMP_TIMEOUT_S: float = 2.0
+
+    # Semantic menu retrieval: "hashing" (offline) or "openai"
+    MENU_EMBEDDER: str = "hashing"
+    MENU_EMBEDDING_DIM: int = 256
+    MENU_EMBEDDINGS_PATH: str | None = None  # prefix for precomputed <path>.npy/<path>.json
+
+    # Write-behind chat message persistence
+    WRITER_QUEUE_MAX: int = 10000  # turns, each a user and an assistant row
+    WRITER_BATCH_SIZE: int = 500
+    WRITER_FLUSH_INTERVAL_S: float = 0.2
+    WRITER_ENQUEUE_TIMEOUT_S: float = 1.0
 
 settings = Settings()
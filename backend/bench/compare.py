@@ -0,0 +1,55 @@
+"""Compare two bench/run.py result files and flag latency regressions.
+
+    cd backend
+    python -m bench.compare baseline.json bench-results.json --max-regression 0.15
+
+Exits 1 when any endpoint present in both files got slower than the allowed
+ratio at the chosen percentile, or its error rate rose by more than
+--max-error-increase.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["endpoints"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--metric", default="p95_ms", choices=("p50_ms", "p95_ms", "p99_ms", "mean_ms"))
+    parser.add_argument("--max-regression", type=float, default=0.10, help="allowed relative slowdown")
+    parser.add_argument("--max-error-increase", type=float, default=0.01, help="allowed absolute error-rate increase")
+    parser.add_argument("--min-count", type=int, default=20, help="ignore endpoints with fewer samples")
+    args = parser.parse_args()
+
+    base, cur = load(args.baseline), load(args.current)
+    failed = []
+    print(f"{'endpoint':<72} {'base':>9} {'current':>9} {'change':>8}")
+    for endpoint in sorted(base.keys() & cur.keys()):
+        b, c = base[endpoint], cur[endpoint]
+        change = (c[args.metric] - b[args.metric]) / b[args.metric] if b[args.metric] else 0.0
+        flag = ""
+        if min(b["count"], c["count"]) >= args.min_count:
+            if change > args.max_regression:
+                flag = "  SLOWER"
+            elif c["error_rate"] - b["error_rate"] > args.max_error_increase:
+                flag = "  ERRORS"
+        if flag:
+            failed.append(endpoint)
+        print(f"{endpoint:<72} {b[args.metric]:>9.1f} {c[args.metric]:>9.1f} {change * 100:>+7.1f}%{flag}")
+    for endpoint in sorted(base.keys() ^ cur.keys()):
+        print(f"{endpoint:<72} only in {'baseline' if endpoint in base else 'current'}")
+
+    if failed:
+        print(f"FAIL: {len(failed)} endpoint(s) regressed")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
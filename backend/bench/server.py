@@ -0,0 +1,76 @@
+"""API server for benchmarks: the real app with Redis and Kafka replaced by
+in-process stand-ins (bench/standins.py) and the LLM pointed at a fake
+OpenAI-compatible server. Postgres is real (DATABASE_URL); tables are created
+and a menu is seeded if missing. Normally started by bench/run.py.
+
+    cd backend
+    python -m bench.server --port 8100 --llm-url http://127.0.0.1:9100/v1
+"""
+from __future__ import annotations
+
+import argparse
+import os
+
+CATEGORIES = {
+    "pizza": ["Margherita", "Pepperoni", "Quattro Formaggi", "Vegan Garden", "Diavola", "Funghi"],
+    "pasta": ["Carbonara", "Pesto Genovese", "Bolognese", "Arrabbiata", "Cacio e Pepe"],
+    "salads": ["Caesar Salad", "Greek Salad", "Quinoa Bowl", "Caprese"],
+    "desserts": ["Tiramisu", "Panna Cotta", "Chocolate Lava Cake", "Lemon Sorbet"],
+    "drinks": ["Lemonade", "Espresso", "Iced Tea", "Sparkling Water"],
+}
+
+
+def prepare_db() -> None:
+    from app.db import models
+    from app.db.session import SessionLocal, engine
+
+    models.Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        if db.query(models.MenuItem).count():
+            return
+        for category, names in CATEGORIES.items():
+            for i, name in enumerate(names):
+                db.add(models.MenuItem(
+                    category=category,
+                    name=name,
+                    description=f"House {name.lower()} made fresh to order",
+                    allergens="gluten, dairy" if category in ("pizza", "pasta", "desserts") else None,
+                    price=8 + i * 1.5,
+                    active=True,
+                ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--llm-url", default="http://127.0.0.1:9100/v1")
+    parser.add_argument("--rate-limit", action="store_true", help="keep per-user rate limits on")
+    args = parser.parse_args()
+
+    os.environ["OPENAI_BASE_URL"] = args.llm_url
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ.setdefault("REDIS_URL", "redis://standin:6379/0")
+    os.environ.setdefault("KAFKA_BOOTSTRAP_SERVERS", "standin:9092")
+    os.environ.setdefault("JWT_SECRET", "bench")
+    os.environ.setdefault("LANGCHAIN_TRACING_V2", "false")
+    if not args.rate_limit:
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+    from bench.standins import install
+
+    install()
+    prepare_db()
+
+    import uvicorn
+    from app.main import app
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# In-process stand-ins for Redis and Kafka used by the bench server.
+# install() must run before app.main is imported: app modules bind the Redis
+# clients with `from app.messaging.redis import ...` at import time.
+import asyncio
+from collections import defaultdict
+
+import fakeredis
+
+
+class InMemoryProducer:
+    # Drop-in for AIOKafkaProducer: records serialized events per topic and
+    # acks immediately.
+    topics: dict[str, list[bytes]] = defaultdict(list)
+
+    def __init__(self, value_serializer=None, **kwargs):
+        self._serialize = value_serializer or (lambda v: v)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def flush(self):
+        pass
+
+    async def send(self, topic, value=None, key=None, **kwargs):
+        self.topics[topic].append(self._serialize(value))
+        fut = asyncio.get_running_loop().create_future()
+        fut.set_result(None)
+        return fut
+
+    async def send_and_wait(self, topic, value=None, key=None, **kwargs):
+        return await (await self.send(topic, value, key))
+
+
+def install() -> None:
+    import app.messaging.kafka as kafka
+    import app.messaging.redis as redis
+
+    server = fakeredis.FakeServer()
+    redis.redis_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    redis.async_redis_client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    redis.async_redis_bytes = fakeredis.FakeAsyncRedis(server=server, decode_responses=False)
+    kafka.AIOKafkaProducer = InMemoryProducer
@@ -0,0 +1,55 @@
+"""Precompute the semantic menu index (app/menu/embeddings.py) to disk.
+
+Writes <out>.npy (contiguous float32 matrix, one unit row per active item)
+and <out>.json (item metadata, embedder settings, menu version). Point
+MENU_EMBEDDINGS_PATH at <out> and API processes memory-map the matrix
+instead of embedding the catalog at startup. Rerun after menu changes;
+a file built for an older menu version is ignored.
+
+    cd backend
+    python -m scripts.build_menu_embeddings --out /data/menu_embeddings
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from app.db import models
+from app.db.session import SessionLocal
+from app.menu.embeddings import SemanticMenuIndex, make_embedder
+from app.menu.version import MENU_VERSION_KEY
+from app.messaging.redis import redis_client
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out", required=True, help="output path prefix")
+    args = ap.parse_args()
+
+    version = int(redis_client.get(MENU_VERSION_KEY) or 0)
+    db = SessionLocal()
+    try:
+        items = db.query(models.MenuItem).filter(models.MenuItem.active.is_(True)).all()
+    finally:
+        db.close()
+
+    index = SemanticMenuIndex(make_embedder())
+    start = time.perf_counter()
+    index.build(items, version)
+    built_s = time.perf_counter() - start
+    index.save(args.out)
+
+    q = np.ascontiguousarray(index.matrix[0]) if len(index) else None
+    if q is not None:
+        start = time.perf_counter()
+        for _ in range(100):
+            index.search(q)
+        print(f"query: {(time.perf_counter() - start) * 10:.2f} ms")
+    print(f"items: {len(index)}  dim: {index.matrix.shape[1]}  menu version: {version}  build: {built_s:.2f}s")
+    print(f"written to {args.out}.npy / {args.out}.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Minimal OpenAI-compatible chat completions server for tests and benchmarks.
+
+Serves POST /v1/chat/completions (plain and stream=true) with canned replies.
+Latency is modelled as time-to-first-token (--latency-ms +/- --jitter-ms)
+plus --reply-tokens generated at --tokens-per-s; --error-rate injects 500s.
+With --seed the jitter and failures are reproducible, so the LLM client's
+timeouts, retries, hedging and circuit breaker (and bench/) can be exercised
+locally and compared between runs.
+
+    cd backend
+    python -m scripts.fake_openai --port 9100 --latency-ms 300 --jitter-ms 200 --error-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1 OPENAI_API_KEY=fake uvicorn app.main:app
+
+Intent classification prompts get a keyword-based label back; everything
+else gets a short fixed answer.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+import orjson
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from app.chat.intent import rule_matches
+
+REPLY = "Thanks for asking! Here is what I can tell you about that.".split()
+
+
+def _label(text: str) -> str:
+    hits = sorted(rule_matches(text))
+    return hits[0] if hits else "info"
+
+
+def _reply(n_tokens: int) -> list[str]:
+    return [REPLY[i % len(REPLY)] for i in range(max(1, n_tokens))]
+
+
+def create_app(
+    latency_ms: float = 200,
+    jitter_ms: float = 0,
+    error_rate: float = 0.0,
+    tokens_per_s: float = 200,
+    reply_tokens: int = 40,
+    seed: int | None = None,
+) -> FastAPI:
+    app = FastAPI()
+    app.state.calls = 0
+    rng = random.Random(seed)
+    token_s = 1 / tokens_per_s if tokens_per_s > 0 else 0.0
+
+    async def _delay() -> None:
+        await asyncio.sleep(max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        app.state.calls += 1
+        body = await request.json()
+        await _delay()
+        if rng.random() < error_rate:
+            return JSONResponse({"error": {"message": "injected failure", "type": "server_error"}}, status_code=500)
+
+        prompt = body["messages"][-1]["content"] if body.get("messages") else ""
+        if isinstance(prompt, list):
+            prompt = " ".join(p.get("text", "") for p in prompt if isinstance(p, dict))
+        if "Classify intent" in prompt:
+            tokens = [_label(prompt.split("User message:", 1)[-1])]
+        else:
+            tokens = _reply(reply_tokens)
+        text = " ".join(tokens)
+        rid, created, model = f"chatcmpl-{uuid.uuid4().hex[:12]}", int(time.time()), body.get("model", "fake")
+        usage = {"prompt_tokens": len(prompt) // 4 + 1, "completion_tokens": len(tokens)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if not body.get("stream"):
+            await asyncio.sleep(len(tokens) * token_s)
+            return Response(orjson.dumps({
+                "id": rid, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            }), media_type="application/json")
+
+        async def chunks():
+            def frame(delta: dict, finish: str | None = None) -> bytes:
+                return b"data: " + orjson.dumps({
+                    "id": rid, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+                }) + b"\n\n"
+
+            yield frame({"role": "assistant", "content": ""})
+            for i, token in enumerate(tokens):
+                await asyncio.sleep(token_s)
+                yield frame({"content": token if i == 0 else " " + token})
+            yield frame({}, "stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield b"data: " + orjson.dumps({
+                    "id": rid, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [], "usage": usage,
+                }) + b"\n\n"
+            yield b"data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tokens-per-s", type=float, default=200)
+    parser.add_argument("--reply-tokens", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    app = create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.tokens_per_s, args.reply_tokens, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
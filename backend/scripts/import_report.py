@@ -0,0 +1,93 @@
+"""Import-time report for the API process (python -X importtime).
+
+Imports a module (default app.main) in a fresh interpreter, prints the
+slowest imports by cumulative time and exits non-zero when a forbidden
+package is pulled in or the total exceeds --budget-ms. Run it in CI as a
+cold-start regression check:
+
+    cd backend
+    python -m scripts.import_report
+    python -m scripts.import_report --budget-ms 4000 --json import_report.json
+
+By default the agent frameworks (crewai, autogen_*) and their heavy
+dependencies are forbidden; they load lazily from app/chat/agents.py.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+
+DEFAULT_FORBIDDEN = ("crewai", "autogen_agentchat", "autogen_ext", "autogen_core", "chromadb", "litellm")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure(module: str) -> list[dict]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr[-4000:])
+        raise SystemExit(f"importing {module} failed")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            self_us, cum_us, indent, name = m.groups()
+            rows.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cum_us) / 1000, "depth": len(indent) // 2})
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--forbid", default=",".join(DEFAULT_FORBIDDEN), help="comma-separated top-level packages")
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    total = next((r["cumulative_ms"] for r in rows if r["module"] == args.module), 0.0)
+    # Top-level packages only, so nested imports are not double counted
+    packages: dict[str, float] = {}
+    for r in rows:
+        root = r["module"].split(".")[0]
+        if r["module"] == root:
+            packages[root] = max(packages.get(root, 0.0), r["cumulative_ms"])
+    forbidden = set(filter(None, args.forbid.split(",")))
+    violations = sorted({r["module"].split(".")[0] for r in rows} & forbidden)
+
+    print(f"{args.module}: {total:.0f} ms total, {len(rows)} modules")
+    print(f"{'cumulative ms':>14}  {'self ms':>8}  module")
+    for r in sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:args.top]:
+        print(f"{r['cumulative_ms']:>14.1f}  {r['self_ms']:>8.1f}  {'  ' * r['depth']}{r['module']}")
+
+    failed = False
+    if violations:
+        print(f"FAIL: forbidden imports: {', '.join(violations)}")
+        failed = True
+    if args.budget_ms is not None and total > args.budget_ms:
+        print(f"FAIL: {total:.0f} ms exceeds budget of {args.budget_ms:.0f} ms")
+        failed = True
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "module": args.module,
+                "total_ms": total,
+                "modules": len(rows),
+                "packages_ms": dict(sorted(packages.items(), key=lambda kv: kv[1], reverse=True)),
+                "forbidden_imports": violations,
+                "budget_ms": args.budget_ms,
+                "passed": not failed,
+            }, f, indent=2)
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Train and evaluate the local intent classifier (app/chat/intent.py).
+
+Input is a JSONL export of chat_messages, one object per line with at least
+"role" and "content". Rows that also carry an "intent" label are used as-is;
+unlabelled user messages can be labelled with the production LLM classifier
+via --label-with-llm. Alternatively read user messages straight from the
+database with --from-db.
+
+    cd backend
+    python -m scripts.train_intent --input chat_messages.jsonl --out intent_model.json
+    python -m scripts.train_intent --from-db --label-with-llm --out intent_model.json
+
+Point INTENT_MODEL_PATH at the output file and tune INTENT_LOCAL_THRESHOLD
+from the coverage/accuracy table this prints.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+
+from app.chat.intent import INTENTS, LocalIntentClassifier, NgramModel
+
+THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95)
+
+
+def read_jsonl(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def read_db() -> list[dict]:
+    from app.db.session import SessionLocal
+    from app.db import models
+
+    db = SessionLocal()
+    try:
+        rows = db.query(models.ChatMessage.content).filter(models.ChatMessage.role == "user").all()
+        return [{"role": "user", "content": r.content} for r in rows]
+    finally:
+        db.close()
+
+
+def label_rows(rows: list[dict], with_llm: bool) -> list[tuple[str, str]]:
+    llm_classify = None
+    if with_llm:
+        from app.chat.graph import llm_classify
+
+    samples = []
+    for row in rows:
+        if row.get("role", "user") != "user" or not row.get("content"):
+            continue
+        label = row.get("intent")
+        if label is None and llm_classify is not None:
+            label = asyncio.run(llm_classify(row["content"]))
+        if label in INTENTS:
+            samples.append((row["content"], label))
+    return samples
+
+
+def evaluate(clf: LocalIntentClassifier, samples: list[tuple[str, str]]) -> None:
+    preds = []
+    start = time.perf_counter()
+    for text, _ in samples:
+        preds.append(clf.predict(text))
+    per_pred_us = (time.perf_counter() - start) / max(len(samples), 1) * 1e6
+
+    correct = sum(p == y for (p, _), (_, y) in zip(preds, samples))
+    print(f"eval samples: {len(samples)}  accuracy: {correct / max(len(samples), 1):.3f}  "
+          f"predict: {per_pred_us:.1f} us/msg")
+
+    per_class = Counter(y for _, y in samples)
+    hits = Counter(y for (p, _), (_, y) in zip(preds, samples) if p == y)
+    for c in INTENTS:
+        if per_class[c]:
+            print(f"  {c:<12} recall {hits[c] / per_class[c]:.3f}  (n={per_class[c]})")
+
+    print("  threshold  coverage  accuracy@covered")
+    for t in THRESHOLDS:
+        covered = [(p, y) for (p, conf), (_, y) in zip(preds, samples) if conf >= t]
+        acc = sum(p == y for p, y in covered) / len(covered) if covered else 0.0
+        print(f"  {t:>9.2f}  {len(covered) / max(len(samples), 1):>8.3f}  {acc:>16.3f}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--input", help="JSONL export of chat_messages")
+    src.add_argument("--from-db", action="store_true", help="read user messages from DATABASE_URL")
+    ap.add_argument("--out", required=True, help="where to write the model JSON")
+    ap.add_argument("--label-with-llm", action="store_true", help="label rows without an intent using the LLM")
+    ap.add_argument("--eval-split", type=float, default=0.2)
+    ap.add_argument("--alpha", type=float, default=0.5, help="naive Bayes smoothing")
+    ap.add_argument("--seed", type=int, default=13)
+    args = ap.parse_args()
+
+    rows = read_db() if args.from_db else read_jsonl(args.input)
+    samples = label_rows(rows, args.label_with_llm)
+    if not samples:
+        raise SystemExit("No labelled user messages found (use --label-with-llm for unlabelled exports)")
+    print(f"labelled samples: {len(samples)}  {dict(Counter(y for _, y in samples))}")
+
+    random.Random(args.seed).shuffle(samples)
+    n_eval = int(len(samples) * args.eval_split)
+    if n_eval:
+        train, test = samples[n_eval:], samples[:n_eval]
+        evaluate(LocalIntentClassifier(NgramModel.train(train, alpha=args.alpha)), test)
+        print("rules only:")
+        evaluate(LocalIntentClassifier(None), test)
+
+    NgramModel.train(samples, alpha=args.alpha).save(args.out)
+    print(f"model written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
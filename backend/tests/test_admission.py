@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from app.chat import admission, graph, llm
+from app.chat.admission import AdmissionRejected
+from app.settings import settings
+
+
+@pytest.fixture
+def limited(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_USER_BURST", 2.0)
+    monkeypatch.setattr(settings, "RATE_LIMIT_USER_PER_MIN", 0.001)
+    monkeypatch.setattr(settings, "PREFETCH_ENABLED", False)
+    monkeypatch.setattr(admission, "_buckets", admission.LocalBuckets())
+    calls = []
+
+    async def fake_ainvoke(purpose, messages):
+        calls.append(purpose)
+        return AIMessage(content="info" if purpose == "classify" else "ok")
+
+    monkeypatch.setattr(llm, "ainvoke", fake_ainvoke)
+    return calls
+
+
+def test_limited_user_is_rejected_before_llm_classification(limited):
+    async def run():
+        for n in range(2):
+            await graph.run_chat_turn(None, 201, n + 1, "hmm")
+        classified = limited.count("classify")
+        with pytest.raises(AdmissionRejected) as e:
+            await graph.run_chat_turn(None, 201, 3, "hmm")
+        return classified, e.value
+
+    classified, rejected = asyncio.run(run())
+    assert rejected.status_code == 429
+    assert limited.count("classify") == classified  # no LLM call for the rejected turn
+
+
+def test_intent_surcharge_is_charged_after_classification(limited, monkeypatch):
+    async def classify_delivery(text):
+        return "delivery"
+
+    monkeypatch.setattr(graph, "llm_classify", classify_delivery)
+    # Burst 2 covers the base cost (1) but not the delivery surcharge (3)
+    with pytest.raises(AdmissionRejected):
+        asyncio.run(graph.run_chat_turn(None, 202, 1, "hmm"))
+    assert admission.stats["rate_limited:delivery"] >= 1
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from fastapi import BackgroundTasks, Response
+
+from app.chat import routes
+from app.chat.schemas import ChatIn
+from app.db.writer import WriterSaturated
+
+
+class FakeWriter:
+    def __init__(self, saturated=False):
+        self.saturated = saturated
+        self.enqueued = []
+
+    async def enqueue(self, conversation_id, messages):
+        if self.saturated:
+            raise WriterSaturated("full")
+        self.enqueued.append((conversation_id, messages))
+
+
+class FakeDb:
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def turns(monkeypatch):
+    calls = []
+
+    async def owned(db, user_id, conversation_id):
+        pass
+
+    async def emit(topic, event):
+        pass
+
+    async def run_chat_turn(db, user_id, conversation_id, text):
+        calls.append(text)
+        return f"answer to {text}", "info"
+
+    async def stream_chat_turn(db, user_id, conversation_id, text):
+        calls.append(text)
+        yield "intent", "info"
+        yield "token", "answer "
+        if len(calls) == 1:
+            raise ConnectionError("provider went away mid-stream")
+        yield "token", "to " + text
+        yield "done", f"answer to {text}"
+
+    monkeypatch.setattr(routes, "_owned_conversation", owned)
+    monkeypatch.setattr(routes, "emit", emit)
+    monkeypatch.setattr(routes, "run_chat_turn", run_chat_turn)
+    monkeypatch.setattr(routes, "stream_chat_turn", stream_chat_turn)
+    return calls
+
+
+def test_retry_after_persistence_failure_replays_instead_of_rerunning(turns, monkeypatch):
+    monkeypatch.setattr(routes, "message_writer", FakeWriter(saturated=True))
+
+    async def turn(conversation_id):
+        response = Response()
+        out = await routes.chat_turn(
+            conversation_id, ChatIn(message="hi"), BackgroundTasks(), response,
+            db=FakeDb(), user_id=301, idempotency_key="k1",
+        )
+        return out.response, response.headers.get("Idempotent-Replayed")
+
+    async def run():
+        return await turn(1), await turn(1)
+
+    first, retry = asyncio.run(run())
+    assert first == ("answer to hi", None)
+    assert retry == ("answer to hi", "true")
+    assert turns == ["hi"]
+
+
+def test_stream_persists_user_and_assistant_rows_once_after_completion(turns, monkeypatch):
+    writer = FakeWriter()
+    monkeypatch.setattr(routes, "message_writer", writer)
+
+    async def stream():
+        resp = await routes.chat_turn_stream(
+            2, ChatIn(message="hi"), db=FakeDb(), user_id=302, idempotency_key="k2",
+        )
+        return [chunk async for chunk in resp.body_iterator]
+
+    async def run():
+        with pytest.raises(ConnectionError):
+            await stream()
+        assert writer.enqueued == []  # nothing stored for the failed attempt
+        return await stream()
+
+    events = asyncio.run(run())
+    assert events[-1].startswith("event: done")
+    assert writer.enqueued == [(2, [("user", "hi"), ("assistant", "answer to hi")])]
@@ -0,0 +1,40 @@
+import math
+
+import pytest
+
+from app.chat.intent import INTENTS, NgramModel, ngrams
+
+SAMPLES = [
+    ("deliver my pizza", "delivery"),
+    ("book a table", "reservation"),
+    ("when do you open", "info"),
+    ("vegan dishes please", "menu"),
+    ("vegan dessert options", "menu"),
+]
+
+
+def _expected(model: NgramModel, text: str) -> list[float]:
+    scores = list(model.priors)
+    for f in ngrams(text):
+        w = model.weights.get(f, model.unseen)
+        scores = [s + x for s, x in zip(scores, w)]
+    z = sum(math.exp(s) for s in scores)
+    return [math.exp(s) / z for s in scores]
+
+
+def test_unseen_ngrams_are_smoothed_per_intent():
+    model = NgramModel.train(SAMPLES)
+    text = "xqzj kwyv"  # no n-gram from training
+    assert not any(f in model.weights for f in ngrams(text))
+    probs = model.probabilities(text)
+    assert probs == pytest.approx(_expected(model, text))
+    # The intent with the most training text pays the most per unseen n-gram
+    assert min(range(len(INTENTS)), key=probs.__getitem__) == INTENTS.index("menu")
+
+
+def test_save_and_load_round_trip(tmp_path):
+    model = NgramModel.train(SAMPLES)
+    path = str(tmp_path / "intent.json")
+    model.save(path)
+    loaded = NgramModel.load(path)
+    assert loaded.probabilities("vegan pizza tonight") == model.probabilities("vegan pizza tonight")
@@ -0,0 +1,40 @@
+import asyncio
+
+from app.messaging import kafka
+from app.settings import settings
+
+
+class SlowProducer:
+    def __init__(self):
+        self.stopped = False
+        self.sends_after_stop = 0
+
+    async def stop(self):
+        self.stopped = True
+
+    async def send(self, topic, value=None, key=None):
+        if self.stopped:
+            self.sends_after_stop += 1
+        await asyncio.sleep(0.05)
+        fut = asyncio.get_running_loop().create_future()
+        fut.set_result(None)
+        return fut
+
+
+def test_drain_timeout_stops_the_sender_before_the_producers(monkeypatch):
+    monkeypatch.setattr(settings, "KAFKA_DRAIN_TIMEOUT_S", 0.1)
+    producer = SlowProducer()
+
+    async def run():
+        monkeypatch.setattr(kafka, "_producers", {settings.KAFKA_DEFAULT_ACKS: producer})
+        monkeypatch.setattr(kafka, "_buffer", asyncio.Queue())
+        monkeypatch.setattr(kafka, "_sender", asyncio.create_task(kafka._send_loop()))
+        for n in range(20):
+            await kafka.emit("chat.message.created", {"n": n})
+        await kafka.stop_kafka()
+        await asyncio.sleep(0.2)  # a sender left running would keep sending
+
+    asyncio.run(run())
+    assert producer.stopped
+    assert producer.sends_after_stop == 0
+    assert kafka._sender is None
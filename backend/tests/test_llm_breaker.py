@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import httpx
+import openai
+import pytest
+
+from app.chat import llm
+from app.chat.admission import AdmissionRejected
+
+
+class FakeModel:
+    def __init__(self, call):
+        self.call = call
+
+    async def ainvoke(self, messages):
+        return await self.call()
+
+
+@pytest.fixture
+def half_open(monkeypatch):
+    breaker = llm.CircuitBreaker(threshold=1, cooldown_s=10)
+    breaker.failures = 1
+    breaker.opened_at = time.monotonic() - 11
+    monkeypatch.setattr(llm, "breaker", breaker)
+    monkeypatch.setattr(llm.settings, "LLM_MAX_RETRIES", 0)
+    return breaker
+
+
+def _use_model(monkeypatch, call):
+    monkeypatch.setattr(llm, "chat_model", lambda purpose: FakeModel(call))
+
+
+def test_guarded_probe_success_closes_circuit(half_open):
+    async def run():
+        async with llm.guarded():
+            pass
+
+    asyncio.run(run())
+    assert half_open.state == "closed"
+    assert half_open.check() is False
+
+
+def test_guarded_probe_failure_reopens_circuit(half_open):
+    async def run():
+        async with llm.guarded():
+            raise openai.APIConnectionError(request=httpx.Request("POST", "http://llm"))
+
+    with pytest.raises(openai.APIConnectionError):
+        asyncio.run(run())
+    assert half_open.state == "open"
+
+
+def test_guarded_probe_other_error_frees_slot(half_open):
+    async def run():
+        async with llm.guarded():
+            raise ValueError("agent bug")
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+    assert half_open.state == "half_open"
+    assert half_open.check() is True  # the next call probes
+
+
+def test_non_retryable_probe_frees_slot(half_open, monkeypatch):
+    async def bad_request():
+        raise openai.BadRequestError(
+            "bad", response=httpx.Response(400, request=httpx.Request("POST", "http://llm")), body=None,
+        )
+
+    _use_model(monkeypatch, bad_request)
+    with pytest.raises(openai.BadRequestError):
+        asyncio.run(llm.ainvoke("info", []))
+    assert half_open.check() is True
+
+
+def test_cancelled_probe_frees_slot(half_open, monkeypatch):
+    async def hang():
+        await asyncio.sleep(10)
+
+    _use_model(monkeypatch, hang)
+
+    async def run():
+        task = asyncio.create_task(llm.ainvoke("info", []))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert half_open.check() is True
+
+
+def test_probe_in_flight_rejects_others(half_open, monkeypatch):
+    async def run():
+        async with llm.guarded():
+            with pytest.raises(AdmissionRejected):
+                half_open.check()
+
+    asyncio.run(run())
@@ -0,0 +1,14 @@
+import json
+import logging
+
+from app.logging import JsonFormatter
+
+
+def test_detail_fields_do_not_borrow_correlation_id():
+    record = logging.LogRecord("db.writer", logging.ERROR, __file__, 1, "db.writer.batch_dropped", None, None)
+    record.count = 12
+    record.detail = "chat.message.created:0:41"
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["count"] == 12
+    assert payload["detail"] == "chat.message.created:0:41"
+    assert "correlation_id" not in payload
@@ -0,0 +1,43 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db import session
+from app.db.session import async_engine
+from app.main import app
+from app.menu import routes, snapshot
+from app.menu.schemas import MenuItemOut
+from app.menu.version import get_menu_version
+
+
+@pytest.fixture(autouse=True)
+def replica(monkeypatch):
+    # A healthy replica, so reads would go there if the menu used it
+    engine = create_async_engine("sqlite+aiosqlite://")
+    monkeypatch.setattr(session, "replica_engine", engine)
+    monkeypatch.setattr(session, "AsyncReadSessionLocal", async_sessionmaker(engine, class_=AsyncSession))
+    monkeypatch.setattr(session, "stats", session.stats.copy())
+    return engine
+
+
+def test_fresh_snapshot_is_served_without_a_database_connection(monkeypatch):
+    item = MenuItemOut(id=1, category="pizza", name="Margherita", description=None, allergens=None, price=9.5)
+    monkeypatch.setattr(snapshot, "_snapshot", snapshot.MenuSnapshot(get_menu_version(), [item]))
+    # No database is reachable here: any checkout would fail the request
+    response = TestClient(app).get("/menu")
+    assert response.status_code == 200
+    assert response.json()[0]["name"] == "Margherita"
+    assert async_engine.pool.checkedout() == 0
+    assert session.stats["replica_reads"] == 0
+
+
+def test_snapshot_rebuilds_read_from_the_primary(monkeypatch):
+    binds = []
+
+    async def fake_get_snapshot(db):
+        binds.append(db.bind)
+        return snapshot.MenuSnapshot(get_menu_version(), [])
+
+    monkeypatch.setattr(routes, "get_snapshot", fake_get_snapshot)
+    assert TestClient(app).get("/menu").status_code == 200
+    assert binds == [async_engine]
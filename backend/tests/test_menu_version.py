@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from redis import RedisError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db import models
+from app.menu import version
+
+
+class Unreachable:
+    def __getattr__(self, name):
+        raise AssertionError("sync Redis client used on the event loop")
+
+
+def _commit_menu_item():
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+        async with async_sessionmaker(engine)() as db:
+            db.add(models.MenuItem(category="pizza", name="Margherita", price=9, active=True))
+            await db.commit()
+        await asyncio.gather(*version._bumps)
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+@pytest.fixture(autouse=True)
+def no_sync_redis(monkeypatch):
+    monkeypatch.setattr(version, "redis_client", Unreachable())
+
+
+def test_async_commit_bumps_the_version_without_the_sync_client():
+    before = version.get_menu_version()
+    _commit_menu_item()
+    assert version.get_menu_version() == before + 1
+
+
+def test_redis_failure_does_not_fail_the_commit(monkeypatch):
+    async def down(*args, **kwargs):
+        raise RedisError("connection refused")
+
+    monkeypatch.setattr(version.async_redis_client, "incr", down)
+    before = version.get_menu_version()
+    _commit_menu_item()  # committed; the failed bump is only logged
+    assert version.get_menu_version() == before
@@ -0,0 +1,11 @@
+from fastapi.testclient import TestClient
+
+from app.db.writer import message_writer
+from app.main import app
+
+
+def test_metrics_exposes_writer_stats(monkeypatch):
+    monkeypatch.setitem(message_writer.stats, "rejected", 3)
+    body = TestClient(app).get("/metrics").text
+    assert 'app_component_stat{component="writer",name="depth"} 0.0' in body
+    assert 'app_component_stat{component="writer",name="rejected"} 3.0' in body
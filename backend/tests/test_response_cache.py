@@ -0,0 +1,34 @@
+import asyncio
+import itertools
+
+from langchain_core.messages import AIMessage
+
+from app.chat import graph, llm
+from app.settings import settings
+
+
+def test_answers_with_history_stay_out_of_the_shared_cache(monkeypatch):
+    counter = itertools.count(1)
+
+    async def fake_ainvoke(purpose, messages):
+        if purpose == "classify":
+            return AIMessage(content="info")
+        return AIMessage(content=f"answer {next(counter)} after {len(messages) - 1} history messages")
+
+    monkeypatch.setattr(llm, "ainvoke", fake_ainvoke)
+    monkeypatch.setattr(settings, "PREFETCH_ENABLED", False)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+
+    async def run():
+        first, _ = await graph.run_chat_turn(None, 101, 1, "What are your opening hours?")
+        follow_up, _ = await graph.run_chat_turn(None, 101, 1, "and on sundays?")
+        # Another user asking the same follow-up must not get user 101's answer
+        other, _ = await graph.run_chat_turn(None, 102, 2, "and on sundays?")
+        # A first message with no history is context-free and may be shared
+        shared, _ = await graph.run_chat_turn(None, 103, 3, "What are your opening hours?")
+        return first, follow_up, other, shared
+
+    first, follow_up, other, shared = asyncio.run(run())
+    assert "after 2 history" in follow_up
+    assert other != follow_up and "after 0 history" in other
+    assert shared == first
@@ -0,0 +1,23 @@
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.session import TimedAsyncQueuePool, _engine_options
+
+
+def test_psycopg_connect_args_only_for_psycopg_urls(tmp_path):
+    assert "connect_args" in _engine_options("postgresql+psycopg://u:p@h/db", "p", 1, 0, TimedAsyncQueuePool)
+
+    url = f"sqlite+aiosqlite:///{tmp_path / 'dev.db'}"
+    options = _engine_options(url, "sqlite", 1, 0, TimedAsyncQueuePool)
+    assert "connect_args" not in options
+
+    async def run():
+        engine = create_async_engine(url, **options)
+        async with engine.connect() as conn:
+            value = await conn.scalar(text("select 1"))
+        await engine.dispose()
+        return value
+
+    assert asyncio.run(run()) == 1
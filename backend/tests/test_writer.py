@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime, timezone
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db import models, writer
+
+
+def _engine(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite://")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _fk(conn, record):
+        conn.execute("PRAGMA foreign_keys=ON")
+
+    monkeypatch.setattr(writer, "async_engine", engine)
+    return engine
+
+
+async def _schema(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+        await conn.execute(models.User.__table__.insert().values(id=1, email="a", password_hash="x"))
+        await conn.execute(models.Conversation.__table__.insert().values(id=1, user_id=1))
+
+
+def test_bad_row_is_dropped_without_losing_the_batch(monkeypatch):
+    engine = _engine(monkeypatch)
+    w = writer.MessageWriter(maxsize=100, batch_size=50, flush_interval_s=0.01, enqueue_timeout_s=0.1)
+    now = datetime.now(timezone.utc)
+    batch = [
+        {"conversation_id": 999 if i == 7 else 1, "role": "user", "content": f"m{i}", "created_at": now}
+        for i in range(20)
+    ]
+
+    async def run():
+        await _schema(engine)
+        await w._flush(batch)
+        async with engine.connect() as conn:
+            return await conn.scalar(select(func.count()).select_from(models.ChatMessage))
+
+    assert asyncio.run(run()) == 19
+    assert w.stats["written"] == 19
+    assert w.stats["dropped"] == 1
+
+
+def test_turn_is_one_queue_entry_and_lands_in_order(monkeypatch):
+    engine = _engine(monkeypatch)
+    w = writer.MessageWriter(maxsize=1, batch_size=50, flush_interval_s=0.01, enqueue_timeout_s=0.01)
+
+    async def run():
+        await _schema(engine)
+        await w.start()
+        # A queue of one turn holds both of its rows
+        await w.enqueue(1, [("user", "hi"), ("assistant", "hello")])
+        await w.stop()
+        async with engine.connect() as conn:
+            return (await conn.execute(select(models.ChatMessage.role).order_by(models.ChatMessage.id))).scalars().all()
+
+    assert asyncio.run(run()) == ["user", "assistant"]
+    assert w.stats["enqueued"] == 2
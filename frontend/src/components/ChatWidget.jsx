@@ -1,15 +1,38 @@
 import React, { useEffect, useState } from "react";
-import { api } from "../api";
+import { api, apiStream, newIdempotencyKey } from "../api";
+
+const SEND_ATTEMPTS = 3;
 
 export default function ChatWidget({ token }) {
   const [conversationId, setConversationId] = useState(null);
   const [text, setText] = useState("");
   const [messages, setMessages] = useState([]);
   const [busy, setBusy] = useState(false);
+  const [olderCursor, setOlderCursor] = useState(null);
+
+  async function loadPage(id, before) {
+    const page = await api(`/chat/conversations/${id}/messages?limit=30${before ? `&before=${before}` : ""}`, { token });
+    setMessages((m) => [...page.messages.map(({ role, content }) => ({ role, content })), ...m]);
+    setOlderCursor(page.older_cursor);
+  }
+
+  async function newConversation() {
+    const d = await api("/chat/conversations", { method: "POST", token });
+    setMessages([]);
+    setOlderCursor(null);
+    setConversationId(d.conversation_id);
+  }
 
+  // Reopen the latest conversation (its last page of messages), or start one
   useEffect(() => {
-    api("/chat/conversations", { method: "POST", token })
-      .then((d) => setConversationId(d.conversation_id))
+    api("/chat/conversations?limit=1", { token })
+      .then(async (d) => {
+        const latest = d.conversations[0];
+        if (!latest) return newConversation();
+        setMessages([]);
+        setConversationId(latest.conversation_id);
+        await loadPage(latest.conversation_id);
+      })
       .catch(() => {});
   }, [token]);
 
@@ -20,13 +43,36 @@ export default function ChatWidget({ token }) {
     setText("");
     setBusy(true);
 
+    setMessages((m) => [...m, { role: "assistant", content: "" }]);
+    const appendToLast = (fn) =>
+      setMessages((m) => [...m.slice(0, -1), { ...m[m.length - 1], content: fn(m[m.length - 1].content) }]);
+
+    // One key per message: a retry after a network error reuses it, so the
+    // server replays (or waits for) the turn instead of running it twice.
+    const idempotencyKey = newIdempotencyKey();
     try {
-      const out = await api(`/chat/conversations/${conversationId}`, {
-        method: "POST",
-        token,
-        body: { message: userMsg.content },
-      });
-      setMessages((m) => [...m, { role: "assistant", content: out.response }]);
+      for (let attempt = 1; ; attempt++) {
+        try {
+          await apiStream(`/chat/conversations/${conversationId}/stream`, {
+            token,
+            body: { message: userMsg.content },
+            idempotencyKey,
+            onEvent: (event, data) => {
+              if (event === "token") appendToLast((c) => c + data.text);
+              else if (event === "done") appendToLast(() => data.response);
+              else if (event === "error") appendToLast(() => data.detail);
+            },
+          });
+          break;
+        } catch (err) {
+          if (err.status || attempt >= SEND_ATTEMPTS) {
+            appendToLast(() => err.message);
+            break;
+          }
+          appendToLast(() => "");
+          await new Promise((r) => setTimeout(r, 500 * attempt));
+        }
+      }
     } finally {
       setBusy(false);
     }
@@ -34,8 +80,18 @@ export default function ChatWidget({ token }) {
 
   return (
     <div style={{ border: "1px solid #ddd", borderRadius: 10, padding: 12 }}>
-      <strong>Private Assistant (per-user chat)</strong>
+      <div style={{ display: "flex", justifyContent: "space-between" }}>
+        <strong>Private Assistant (per-user chat)</strong>
+        <button onClick={() => newConversation().catch(() => {})} disabled={busy}>
+          New chat
+        </button>
+      </div>
       <div style={{ height: 220, overflow: "auto", marginTop: 10, padding: 8, background: "#fafafa" }}>
+        {olderCursor && (
+          <button onClick={() => loadPage(conversationId, olderCursor).catch(() => {})} style={{ marginBottom: 10 }}>
+            Load earlier messages
+          </button>
+        )}
         {messages.map((m, idx) => (
           <div key={idx} style={{ marginBottom: 10 }}>
             <b>{m.role}:</b> {m.content}